@@ -0,0 +1,123 @@
+import logging
+import xml.etree.ElementTree as ET
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from os import cpu_count
+from pathlib import Path
+
+import main
+from converter import Options, Result, convert
+from parser.source import open_source
+
+__all__ = ["is_package", "collect_packages", "package_size", "short_name", "convert_all"]
+
+logger = logging.getLogger("batch")
+
+
+def is_package(path: Path) -> bool:
+    """Check that path is polygon package: *.zip file or dir with problem.xml."""
+    if path.is_file():
+        return path.suffix == ".zip"
+    return (path / "problem.xml").is_file()
+
+
+def collect_packages(patterns: list[str]) -> list[Path]:
+    """
+    Collect polygon packages by paths or glob patterns.
+    Directory which is not a package is scanned for packages inside it.
+    """
+    packages = []
+    for pattern in patterns:
+        for path in map(Path, glob(pattern) or [pattern]):
+            if is_package(path):
+                packages.append(path)
+            elif path.is_dir():
+                packages.extend(sorted(el for el in path.iterdir() if is_package(el)))
+            else:
+                logger.warning(f"Skipped `{path}`: it is not |zip| or |dir| of polygon package")
+    return list({path.resolve(): path for path in packages}.values())
+
+
+def package_size(path: Path) -> int:
+    """Return the size of the package in bytes."""
+    if path.is_file():
+        return path.stat().st_size
+    return sum(el.stat().st_size for el in path.rglob("*") if el.is_file())
+
+
+def short_name(path: Path) -> str | None:
+    """Return short-name of the problem which names its CATS package, None if it is not read."""
+    try:
+        with open_source(path) as source, source.open(Path("problem.xml")) as problem_file:
+            _, root = next(ET.iterparse(problem_file, events=("start",)))
+            return root.attrib.get("short-name")
+    except (OSError, ValueError, ET.ParseError, StopIteration):
+        return None
+
+
+def _init_worker(level: int) -> None:
+    if not logging.root.handlers:
+        main.setup_logging()
+    logging.root.setLevel(level)
+
+
+def convert_all(packages: list[Path], jobs: int = None, log_level: int = logging.WARNING,
+                options: Options = None, output: Path = None) -> dict[Path, Result | Exception]:
+    """
+    Convert packages in the process pool, the largest packages first.
+    Return the result or the raised exception for every package.
+    """
+    packages = sorted(packages, key=package_size, reverse=True)
+    results = {}
+    # Packages with the same short-name would be written to the same CATS package at once.
+    by_name: dict[str, list[Path]] = {}
+    for path in packages:
+        if (name := short_name(path)) is not None:
+            by_name.setdefault(name, []).append(path)
+    for name, same in by_name.items():
+        if len(same) > 1:
+            for path in same:
+                results[path] = ValueError(f"Short name `{name}` is the same for packages: "
+                                           + ", ".join(map(str, same)))
+                logger.error(f"Skipped {path}: {results[path]}")
+    packages = [path for path in packages if path not in results]
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(log_level,)) as pool:
+        futures = {pool.submit(convert, path, output, options): path for path in packages}
+        for i, future in enumerate(as_completed(futures)):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+                logger.info(f"({i + 1}/{len(packages)}) Converted {path} -> {results[path].path}")
+                main.print_report(results[path], options and options.report)
+            except Exception as e:
+                results[path] = e
+                logger.error(f"({i + 1}/{len(packages)}) Failed {path}: {e!r}")
+    return results
+
+
+if __name__ == '__main__':
+    arg_parser = ArgumentParser(description="Convert many polygon packages to CATS packages")
+    arg_parser.add_argument("packages", nargs="+",
+                            help="polygon package |zip| or |dir|, dir of packages or glob pattern")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=cpu_count(),
+                            help="number of worker processes")
+    arg_parser.add_argument("-v", "--verbose", action="store_true",
+                            help="show logs of each conversion")
+    arg_parser.add_argument("-o", "--output", type=Path,
+                            help="dir of CATS packages, config/result_dir by default")
+    main.add_options(arg_parser)
+    args = arg_parser.parse_args()
+
+    main.setup_logging()
+    logging.root.setLevel(logging.INFO)
+    found = collect_packages(args.packages)
+    logger.info(f"Found {len(found)} polygon packages")
+    converted = convert_all(found, args.jobs, logging.INFO if args.verbose else logging.WARNING,
+                            Options.from_args(args), args.output)
+
+    failed = [path for path, res in converted.items() if isinstance(res, Exception)]
+    logger.info(f"Finished: {len(converted) - len(failed)} converted, {len(failed)} failed")
+    for path in failed:
+        logger.error(f"Failed {path}: {converted[path]!r}")
+    raise SystemExit(1 if failed else 0)
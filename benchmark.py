@@ -0,0 +1,233 @@
+import json
+import logging
+import platform
+import time
+from argparse import ArgumentParser
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from functools import wraps
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Iterator
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import config as cfg
+import main
+from converter import Options, convert_problem
+from parser.problem import Problem
+from parser.services import get_properties
+from parser.source import open_source
+from writer.files import Copier
+from writer.target import DirTarget, ZipTarget
+from writer.xmler import CatsXml
+
+__all__ = ["PackageParams", "PhaseTimer", "make_package", "run_benchmark"]
+
+logger = logging.getLogger("benchmark")
+
+LANGUAGES = ("russian", "english", "ukrainian", "german", "french", "spanish", "chinese")
+
+
+@dataclass
+class PackageParams:
+    """Shape of the synthetic polygon package."""
+    tests: int = 1000
+    test_size: int = 1024
+    languages: int = 2
+    groups: int = 3
+    generators: int = 2
+    resources: int = 3
+    # Every n-th test is manual, the others are generated.
+    manual_every: int = 4
+    zip: bool = False
+
+
+def _problem_xml(params: PackageParams, languages: tuple[str, ...]) -> str:
+    tests = []
+    for i in range(1, params.tests + 1):
+        group = f' group="g{(i - 1) * params.groups // params.tests + 1}"' if params.groups else ""
+        if i % params.manual_every == 0 or not params.generators:
+            tests.append(f'<test method="manual"{group} points="1"/>')
+        else:
+            tests.append(f'<test cmd="gen{i % params.generators + 1} {i}" method="generated"'
+                         f'{group} points="1"/>')
+    groups = "".join(f'<group feedback-policy="icpc" name="g{g}" points-policy="each-test"/>'
+                     for g in range(1, params.groups + 1))
+    executables = "".join(f'<executable><source path="files/gen{g}.cpp" type="cpp.g++17"/>'
+                          f'</executable>' for g in range(1, params.generators + 1))
+    names = "".join(f'<name language="{lang}" value="Bench {lang}"/>' for lang in languages)
+    statements = "".join(f'<statement charset="UTF-8" language="{lang}" mathjax="true" '
+                         f'path="statements/{lang}/problem.tex" type="application/x-tex"/>'
+                         for lang in languages)
+    return f"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<problem revision="1" short-name="bench-{params.tests}" url="https://polygon.codeforces.com/p/bench">
+  <names>{names}</names>
+  <statements>{statements}</statements>
+  <judging cpu-name="Intel" cpu-speed="3600" input-file="" output-file="" run-count="1">
+    <testset name="tests">
+      <time-limit>1000</time-limit>
+      <memory-limit>268435456</memory-limit>
+      <test-count>{params.tests}</test-count>
+      <input-path-pattern>tests/%02d</input-path-pattern>
+      <answer-path-pattern>tests/%02d.a</answer-path-pattern>
+      <tests>{"".join(tests)}</tests>
+      <groups>{groups}</groups>
+    </testset>
+  </judging>
+  <files>
+    <resources><file path="files/olymp.sty"/><file path="files/testlib.h" type="h.g++"/></resources>
+    <executables>{executables}</executables>
+  </files>
+  <assets>
+    <checker name="std::ncmp.cpp" type="testlib"><source path="files/check.cpp" type="cpp.g++17"/></checker>
+    <solutions>
+      <solution tag="main"><source path="solutions/main.cpp" type="cpp.g++17"/></solution>
+      <solution tag="accepted"><source path="solutions/ok.py" type="python.3"/></solution>
+    </solutions>
+  </assets>
+</problem>
+"""
+
+
+def _properties(language: str) -> dict:
+    samples = [{"input": f"{i} {i}\n", "output": f"{2 * i}\n",
+                "inputFile": "example.%02d" % i, "outputFile": "example.%02d.a" % i}
+               for i in (1, 2)]
+    return {"name": f"Bench {language}", "language": language, "authorLogin": "bench",
+            "authorName": "Bench", "timeLimit": 1000, "memoryLimit": 268435456,
+            "legend": "Given numbers $a$ and $b$, find \\textbf{sum}.\n\n" * 20,
+            "input": "Two integers $a, b \\le 10^9$.", "output": "One integer.",
+            "inputFile": "stdin", "outputFile": "stdout", "scoring": None, "notes": "Notes.",
+            "interaction": None, "tutorial": "Easy.", "sampleTests": samples}
+
+
+def make_package(root: Path, params: PackageParams) -> Path:
+    """Write the synthetic polygon package to root dir, or to root.zip for zip option."""
+    languages = LANGUAGES[:params.languages]
+    files = {Path("problem.xml"): _problem_xml(params, languages).encode()}
+    for i in range(1, params.tests + 1):
+        if i % params.manual_every == 0 or not params.generators:
+            files[Path("tests") / ("%02d" % i)] = (f"{i}\n" * params.test_size)[:params.test_size].encode()
+        files[Path("tests") / ("%02d.a" % i)] = f"{i}\n".encode()
+    for name in ("olymp.sty", "testlib.h", "check.cpp",
+                 *(f"gen{g}.cpp" for g in range(1, params.generators + 1))):
+        files[Path("files") / name] = f"// {name}\n".encode()
+    for name in ("main.cpp", "ok.py"):
+        files[Path("solutions") / name] = f"// {name}\n".encode()
+    for lang in languages:
+        statement_dir = Path("statements") / lang
+        files[statement_dir / "problem-properties.json"] = json.dumps(_properties(lang)).encode()
+        for i in (1, 2):
+            files[statement_dir / ("example.%02d" % i)] = f"{i} {i}\n".encode()
+            files[statement_dir / ("example.%02d.a" % i)] = f"{2 * i}\n".encode()
+        for r in range(1, params.resources + 1):
+            files[statement_dir / f"picture{r}.png"] = b"\x89PNG" + bytes(4096)
+
+    if params.zip:
+        zip_path = root.with_suffix(".zip")
+        with ZipFile(zip_path, "w", ZIP_DEFLATED) as zf:
+            for path, data in files.items():
+                zf.writestr(path.as_posix(), data)
+        return zip_path
+    for path, data in files.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(data)
+    return root
+
+
+class PhaseTimer:
+    """Sum of wall time and number of calls of every phase of the conversion."""
+
+    def __init__(self):
+        self.phases: dict[str, dict[str, float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        phase = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+        phase["seconds"] += seconds
+        phase["calls"] += 1
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, obj, prefix: str):
+        """Time every public method of the object, the calls of nested methods are included."""
+        for name in dir(obj):
+            method = getattr(obj, name)
+            if name.startswith("_") or not callable(method):
+                continue
+
+            def timed(*args, _name=f"{prefix}.{name}", _method=method, **kwargs):
+                with self.span(_name):
+                    return _method(*args, **kwargs)
+            setattr(obj, name, wraps(method)(timed))
+        return obj
+
+
+def run_benchmark(package_path: Path, result_root: Path, options: Options) -> dict:
+    """Convert the package once, return wall time of every phase."""
+    timer = PhaseTimer()
+    start = time.perf_counter()
+    with open_source(package_path) as source:
+        with timer.span("Problem"):
+            problem = Problem(Path("problem.xml"), source, stream=options.stream_parse)
+        with timer.span("get_properties"):
+            properties = get_properties(problem)
+        target = ZipTarget(result_root.with_suffix(".zip"), options.compress_level) \
+            if options.zip else DirTarget(result_root, options.placement)
+        with target:
+            cop = timer.wrap(Copier(source, target, options.io_workers), "Copier")
+            if options.stream_xml:
+                with target.open_stream(cfg.result_xml) as stream:
+                    cats = timer.wrap(CatsXml(stream=stream), "CatsXml")
+                    convert_problem(problem, properties, cop, cats, options.dedup)
+            else:
+                cats = timer.wrap(CatsXml(), "CatsXml")
+                convert_problem(problem, properties, cop, cats, options.dedup)
+    return {"total": time.perf_counter() - start, "phases": timer.phases}
+
+
+if __name__ == '__main__':
+    arg_parser = ArgumentParser(description="Benchmark conversion of synthetic polygon packages")
+    arg_parser.add_argument("--tests", type=int, nargs="+", default=[1000, 10000, 100000],
+                            help="numbers of tests, one package for each")
+    arg_parser.add_argument("--test-size", type=int, default=PackageParams.test_size,
+                            help="size of manual test input in bytes")
+    arg_parser.add_argument("--languages", type=int, choices=range(1, len(LANGUAGES) + 1),
+                            default=PackageParams.languages, help="number of statement languages")
+    arg_parser.add_argument("--groups", type=int, default=PackageParams.groups)
+    arg_parser.add_argument("--generators", type=int, default=PackageParams.generators)
+    arg_parser.add_argument("--resources", type=int, default=PackageParams.resources,
+                            help="number of statement resources of each language")
+    arg_parser.add_argument("--manual-every", type=int, default=PackageParams.manual_every,
+                            help="every n-th test is manual")
+    arg_parser.add_argument("--zip-package", action="store_true",
+                            help="read synthetic package from *.zip")
+    arg_parser.add_argument("--repeat", type=int, default=1, help="conversions of each package")
+    arg_parser.add_argument("-o", "--output", type=Path, default=Path("benchmark.json"),
+                            help="path of json with results")
+    main.add_options(arg_parser)
+    args = arg_parser.parse_args()
+
+    main.setup_logging()
+    logging.root.setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    options = Options.from_args(args)
+    report = {"version": cfg.version, "python": platform.python_version(),
+              "platform": platform.platform(), "options": asdict(options), "runs": []}
+    with TemporaryDirectory() as tmp:
+        for tests in args.tests:
+            params = PackageParams(tests, args.test_size, args.languages, args.groups,
+                                   args.generators, args.resources, args.manual_every,
+                                   args.zip_package)
+            package = make_package(Path(tmp) / f"polygon-{tests}", params)
+            for i in range(args.repeat):
+                run = run_benchmark(package, Path(tmp) / f"cats-{tests}-{i}", options)
+                report["runs"].append({"params": asdict(params), **run})
+                logger.info(f"{tests} tests, run {i + 1}/{args.repeat}: {run['total']:.3f} s")
+    args.output.write_text(json.dumps(report, indent=2))
+    logger.info(f"Results saved to {args.output}")
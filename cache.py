@@ -0,0 +1,184 @@
+import json
+import os
+import pickle
+from hashlib import sha256
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import config as cfg
+from core import Logged
+
+if TYPE_CHECKING:
+    from parser.problem import Problem
+    from parser.source import PackageSource
+    from parser.statement import StatementProperties
+
+__all__ = ["DiskCache", "ConversionCache", "ProblemCache", "package_hash"]
+
+HASH_BUFFER = 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    """Return sha256 of the file content."""
+    h = sha256()
+    with open(path, "rb") as inp:
+        while chunk := inp.read(HASH_BUFFER):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache(Logged):
+    """
+    Size-bounded key-value store in the directory, one file per key.
+    The file mtime is the last access time, the least recently used files are evicted.
+    """
+
+    def __init__(self, root: Path, max_size: int = cfg.cache_max_size):
+        self.root = Path(root)
+        self.max_size = max_size
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    def get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        part_path = self._path(f"{key}.{os.getpid()}.part")
+        part_path.write_bytes(data)
+        part_path.replace(self._path(key))
+        self._evict()
+
+    def remove(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        entries = []
+        for el in os.scandir(self.root):
+            if el.is_file() and not el.name.endswith(".part"):
+                stat = el.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, el.path))
+        size = sum(el[1] for el in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            Path(path).unlink(missing_ok=True)
+            size -= entry_size
+            self.logger.debug(f"Evicted cache entry ({path})")
+
+    def get_json(self, key: str):
+        data = self.get(key)
+        return None if data is None else json.loads(data)
+
+    def put_json(self, key: str, value) -> None:
+        self.put(key, json.dumps(value).encode())
+
+
+def _dir_manifest(root: Path, previous: dict[str, list] = None) -> dict[str, list]:
+    """
+    Return {local path: [size, mtime, hash]} for all files of the dir.
+    Hashes of files with the same size and mtime are taken from the previous manifest.
+    """
+    previous = previous or {}
+    manifest = {}
+    for path in sorted(root.rglob("*")):
+        if not path.is_file():
+            continue
+        stat = path.stat()
+        local = path.relative_to(root).as_posix()
+        old = previous.get(local)
+        if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+            manifest[local] = old
+        else:
+            manifest[local] = [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+    return manifest
+
+
+def package_hash(package_path: Path, cache: DiskCache = None) -> str:
+    """
+    Return the content hash of polygon package: hash of *.zip bytes
+    or hash of the manifest of dir files (saved to cache to skip rehashing of unchanged files).
+    """
+    if package_path.is_file():
+        return file_hash(package_path)
+
+    manifest_key = "manifest-" + sha256(str(package_path.resolve()).encode()).hexdigest()
+    previous = cache.get_json(manifest_key) if cache else None
+    manifest = _dir_manifest(package_path, previous)
+    if cache and manifest != previous:
+        cache.put_json(manifest_key, manifest)
+    return sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+
+class ConversionCache(Logged):
+    """Cache of finished conversions, keyed by the package content and converter version."""
+
+    def __init__(self, root: Path = cfg.cache_dir / "conversions",
+                 max_size: int = cfg.cache_max_size):
+        self.store = DiskCache(root, max_size)
+
+    def key(self, package_path: Path, options_key: str) -> str:
+        content = package_hash(package_path, self.store)
+        return sha256(f"{cfg.version}|{options_key}|{content}".encode()).hexdigest()
+
+    def get(self, key: str) -> Path | None:
+        """
+        Return the result path of the cached conversion,
+        if it still exists and was not overwritten by another conversion.
+        """
+        record = self.store.get_json(key)
+        if record is None:
+            return None
+        result = Path(record["result"])
+        if not result.is_file() or result.stat().st_mtime_ns != record["mtime"]:
+            self.store.remove(key)
+            return None
+        return result
+
+    def put(self, key: str, result: Path) -> None:
+        self.store.put_json(key, {"result": str(result), "mtime": result.stat().st_mtime_ns})
+
+
+class ProblemCache(Logged):
+    """
+    Cache of parsed problem.xml and problem-properties.json, keyed by the hash of problem.xml
+    and converter version. The hashes of properties files are checked on every load.
+    """
+
+    def __init__(self, root: Path = cfg.cache_dir / "problems",
+                 max_size: int = cfg.cache_max_size):
+        self.store = DiskCache(root, max_size)
+
+    @staticmethod
+    def key(source: "PackageSource", problem_path: Path = Path("problem.xml")) -> str:
+        return sha256(f"{cfg.version}|{source.digest(problem_path)}".encode()).hexdigest()
+
+    def get(self, key: str, source: "PackageSource") \
+            -> tuple["Problem", list["StatementProperties"]] | None:
+        """Return the parsed problem attached to the source and its statements properties."""
+        data = self.store.get(key)
+        if data is None:
+            return None
+        try:
+            problem, properties, digests = pickle.loads(data)
+        except Exception as e:
+            self.logger.warning(f"Cache entry is broken, removed ({e!r})")
+            self.store.remove(key)
+            return None
+        for path, digest in digests.items():
+            if not source.is_file(path) or source.digest(path) != digest:
+                return None
+        return problem.attach(source), properties
+
+    def put(self, key: str, source: "PackageSource", problem: "Problem",
+            properties: list["StatementProperties"]) -> None:
+        digests = {prop.path: source.digest(prop.path) for prop in properties}
+        self.store.put(key, pickle.dumps((problem, properties, digests),
+                                         pickle.HIGHEST_PROTOCOL))
@@ -2,15 +2,17 @@ from enum import Enum
 from pathlib import Path
 import logging
 
+version = "0.2"
 project_dir = Path(__file__).parent
 
 result_dir = project_dir / Path("cats/")
-unpack_dir = project_dir / Path("polygon/")
 search_dir = (Path(""), project_dir, project_dir / "polygon")
 result_xml = Path("problem.xml")
-logging.root.setLevel(logging.INFO)
-
-result_dir.mkdir(parents=True, exist_ok=True)
+cache_dir = project_dir / Path(".cache/")
+cache_max_size = 64 * 1024 * 1024
+placement = "auto"
+io_workers = 8
+log_level = logging.INFO
 
 
 class Compiler(Enum):
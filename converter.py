@@ -0,0 +1,342 @@
+import logging
+import shutil
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import config as cfg
+from report import Report
+
+# The pipeline modules are imported by the functions, so the import of converter is fast.
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from delta import Delta
+    from parser.problem import Problem
+    from parser.source import PackageSource
+    from parser.statement import StatementProperties
+    from writer.files import Copier
+    from writer.plan import PlanTarget
+    from writer.target import PackageTarget
+    from writer.xmler import CatsXml
+
+__all__ = ["Options", "Result", "convert", "convert_problem", "open_target", "plan"]
+
+logger = logging.getLogger("converter")
+
+
+@dataclass
+class Options:
+    """Options of the conversion."""
+    zip: bool = False
+    compress_level: int = None
+    dedup: bool = False
+    # Options which do not change the result package are not a part of the cache key.
+    force: bool = field(default=False, metadata={"cache": False})
+    placement: str = field(default=cfg.placement, metadata={"cache": False})
+    io_workers: int = field(default=cfg.io_workers, metadata={"cache": False})
+    stream_xml: bool = field(default=False, metadata={"cache": False})
+    stream_parse: bool = field(default=False, metadata={"cache": False})
+    overlap: bool = field(default=False, metadata={"cache": False})
+    report: str = field(default=None, metadata={"cache": False})
+    profile: str = field(default=None, metadata={"cache": False})
+    # The conversion cache is neither read nor written, e.g. for temporary packages.
+    use_cache: bool = field(default=True, metadata={"cache": False})
+
+    @classmethod
+    def from_args(cls, args: "Namespace") -> "Options":
+        return cls(zip=args.zip, compress_level=args.compress_level,
+                   dedup=args.dedup, force=args.force,
+                   placement=args.placement, io_workers=args.io_workers,
+                   stream_xml=args.stream_xml, stream_parse=args.stream_parse,
+                   overlap=args.overlap, report=args.report, profile=args.profile)
+
+    def cache_key(self) -> str:
+        """Return the options which change the result package."""
+        return repr({f.name: getattr(self, f.name) for f in fields(self)
+                     if f.metadata.get("cache", True)})
+
+
+@dataclass
+class Result:
+    """Result of the conversion, report is None for the package found in the cache."""
+    package_path: Path
+    # Path to result xml, or to result archive for zip option.
+    path: Path
+    cached: bool = False
+    report: Report | None = None
+    delta: "Delta | None" = None
+
+
+def convert(package_path: Path, output: Path = None, options: Options = None,
+            delta_from: Path = None) -> Result:
+    """
+    Convert polygon package (dir or zip) to CATS package in output dir (config/result_dir).
+    With delta_from the changes since that CATS package are written to the delta next to it.
+    """
+    from cache import ConversionCache
+    from delta import load_manifest
+    from parser.source import open_source
+
+    package_path = Path(package_path)
+    options = options or Options()
+    # The base is read before the conversion, it may be overwritten by the result.
+    base = load_manifest(delta_from, options.io_workers) if delta_from else None
+    cache = ConversionCache() if options.use_cache else None
+    key = cache.key(package_path, options.cache_key() + str(output or "")) if cache else None
+    # The package is converted again to be profiled.
+    if cache and not options.force and not options.profile and (result_path := cache.get(key)):
+        logger.info(f"Package is not changed, found in cache: {result_path}")
+        result = Result(package_path, result_path, cached=True)
+    else:
+        logger.info(f"Started processing polygon package ({package_path})")
+        report = Report(str(package_path))
+        if options.profile:
+            from profiler import PhaseProfiler
+            report.profiler = PhaseProfiler(options.profile)
+        with open_source(package_path) as source:
+            result_path = _convert_source(source, options, report, output)
+        if report.profiler:
+            package = _package_path(result_path, options)
+            report.profiler.dump(package.with_name(
+                (package.stem if options.zip else package.name) + ".profile"))
+        # The target and the profiler are closed, they are not a part of the result.
+        report.target = report.profiler = None
+        if cache:
+            cache.put(key, result_path)
+        result = Result(package_path, result_path, report=report)
+    if base is not None:
+        result.delta = _write_delta(base, str(delta_from), result_path, options)
+    return result
+
+
+def plan(package_path: Path, output: Path = None, options: Options = None) -> "PlanTarget":
+    """
+    Plan the conversion without writing anything: the files which would be copied
+    to CATS package and cats.xml. The contents of files are not read, so identical
+    files are found only among zip members (by checksum) and the plan is an upper bound.
+    """
+    from parser.source import open_source
+    from writer.files import Copier
+    from writer.plan import PlanTarget
+    from writer.xmler import CatsXml
+
+    options = options or Options()
+    with open_source(Path(package_path)) as source:
+        problem, statements_properties = _parse_source(source, options, write_cache=False)
+        short_name = problem.problem.attrib["short-name"]
+        target = PlanTarget(Path(output or cfg.result_dir) /
+                            (f"{short_name}.zip" if options.zip else short_name))
+        convert_problem(problem, statements_properties,
+                        Copier(source, target, hash_files=False), CatsXml(), options.dedup)
+    return target
+
+
+def _package_path(result_path: Path, options: Options) -> Path:
+    """Return CATS package dir or archive by the result path."""
+    return result_path if options.zip else result_path.parent
+
+
+def _write_delta(base: dict[str, dict], base_name: str, result_path: Path,
+                 options: Options) -> "Delta":
+    """Write the delta of the result package: <short-name>.delta dir or <short-name>.delta.zip."""
+    from delta import make_delta
+    from parser.source import open_source
+    from writer.target import DirTarget, ZipTarget
+
+    package_path = _package_path(result_path, options)
+    if options.zip:
+        delta_path = result_path.with_suffix(".delta.zip")
+        target = ZipTarget(delta_path, options.compress_level)
+    else:
+        delta_path = package_path.with_name(package_path.name + ".delta")
+        # Files of the previous delta must not stay in the new one.
+        shutil.rmtree(delta_path, ignore_errors=True)
+        target = DirTarget(delta_path, options.placement)
+    with open_source(package_path) as source, target:
+        delta = make_delta(base, source, target, base_name, options.io_workers)
+    delta.path = delta_path
+    logger.info(f"Delta saved to {delta_path}: {delta}")
+    return delta
+
+
+def open_target(short_name: str, options: Options, result_dir: Path = None,
+                clean: bool = False) -> "PackageTarget":
+    """
+    Return the target of CATS package in result dir (config/result_dir) by the options.
+    With clean the files of the previous package dir are removed, the archive is always new.
+    """
+    from writer.target import DirTarget, ZipTarget
+
+    result_dir = Path(result_dir or cfg.result_dir)
+    if options.zip:
+        return ZipTarget(result_dir / f"{short_name}.zip", options.compress_level)
+    if clean:
+        shutil.rmtree(result_dir / short_name, ignore_errors=True)
+    return DirTarget(result_dir / short_name, options.placement)
+
+
+def _parse_source(source: "PackageSource", options: Options, report: Report = None,
+                  write_cache: bool = True) -> tuple["Problem", list["StatementProperties"]]:
+    from cache import ProblemCache
+    from parser.problem import Problem
+    from parser.services import get_properties
+
+    report = report or Report()
+    # Lazy tests of the stream parsing read problem.xml again, such problem is not cached.
+    # The profiled problem and the problem without the cache (use_cache) are always parsed.
+    problems = None if options.stream_parse or options.profile or not options.use_cache \
+        else ProblemCache()
+    with report.span("parse"):
+        key = problems.key(source) if problems else None
+        cached = problems.get(key, source) if problems else None
+        if cached:
+            logger.debug("Found parsed polygon/|problem.xml| in cache")
+            return cached
+        problem = Problem(Path("problem.xml"), source, stream=options.stream_parse)
+    logger.debug("Parsed polygon/|problem.xml| ")
+
+    with report.span("properties"):
+        statements_properties = get_properties(problem)
+    logger.debug("Finished parse all polygon/.../|problem-properties.json|")
+    if problems and write_cache:
+        problems.put(key, source, problem, statements_properties)
+    return problem, statements_properties
+
+
+def _convert_source(source: "PackageSource", options: Options, report: Report = None,
+                    result_dir: Path = None) -> Path:
+    from writer.files import Copier
+    from writer.xmler import CatsXml
+
+    report = report or Report()
+    problem, statements_properties = _parse_source(source, options, report)
+
+    # Files of the previous conversion must not stay in the package, e.g. removed tests.
+    with open_target(problem.problem.attrib["short-name"], options, result_dir,
+                     clean=True) as target:
+        logger.info(f"Created |{type(target).__name__}| for cats package")
+        report.target = target
+        cop = Copier(source, target, options.io_workers, background=options.overlap)
+        try:
+            if options.stream_xml:
+                with target.open_stream(cfg.result_xml) as stream:
+                    convert_problem(problem, statements_properties, cop, CatsXml(stream=stream),
+                                    options.dedup, report)
+            else:
+                convert_problem(problem, statements_properties, cop, CatsXml(),
+                                options.dedup, report)
+        finally:
+            cop.close()
+    result_path = target.path if options.zip else target.root / cfg.result_xml
+    logger.info(f"INFO: Finished processing polygon package. Save to {result_path}")
+    return result_path
+
+
+def convert_problem(problem: "Problem", statements_properties: list["StatementProperties"],
+                    cop: "Copier", cats: "CatsXml", dedup: bool = False,
+                    report: Report = None) -> None:
+    """
+    Copy the files of the parsed problem by the copier and save cats.xml to its target,
+    the stages are measured by the report.
+    """
+    from writer.utils import choose_properties, choose_testset, get_generators, get_groups_tests
+
+    report = report or Report()
+    logger.info("Started to create cats.xml")
+
+    cats.set_title(problem, main_properties := choose_properties(statements_properties))
+    logger.debug("Set attributes for <Problem> tag of cats.xml")
+
+    with report.span("resources"):
+        resources = cop.statement_resources(statements_properties)
+        logger.debug("Copied |resource| files of all languages to cats package")
+        cats.add_resources(resources)
+        logger.debug("Added |Picture| and |Attachment| tags to cats.xml")
+
+    with report.span("statements"):
+        logger.debug("Started adding |problem-properties.json| to cats.xml")
+        st_count = len(statements_properties)
+        for i, st_properties in enumerate(statements_properties):
+            cats.add_txt_by_properties(st_properties)
+            logger.debug(f"Added |{st_properties.language}|/problem-properties.json "
+                         f"({i + 1}/{st_count}) to cats.xml")
+        logger.debug("Finished adding |problem-properties.json| to cats.xml")
+
+    with report.span("samples"):
+        samples = cop.samples(statements_properties)
+        logger.debug("Copied |sample| files to cats package")
+        by_language = {prop.language: prop for prop in statements_properties}
+        for language, (inp_path, ans_path) in samples.items():
+            cats.add_samples_by_properties(by_language.get(language, main_properties),
+                                           use_file=True, local_in=inp_path, local_ans=ans_path,
+                                           shared=language is None)
+        logger.debug("Added |samples| to cats.xml")
+
+    with report.span("checker"):
+        cats.import_testlib()
+        logger.debug("Added import tags for use |testlib| to cats.xml")
+
+        cop.checker(problem.checker)
+        logger.debug("Copied |checker| file to cats package")
+        cats.set_checker(problem.checker)
+        logger.debug("Added |Checker| tag to cats.xml")
+
+    with report.span("solutions"):
+        cop.solutions(problem.solutions)
+        logger.debug("Started adding |Solution| tag to cats.xml")
+        cats.add_solutions(problem.solutions)
+        logger.debug("Finished adding |Solution| tag to cats.xml")
+
+    if problem.is_interactive:
+        with report.span("interactor"):
+            logger.debug("Package is interactive")
+            cop.interactor(problem.interactor)
+            logger.debug("Copied |interactor| file to cats package")
+            cats.use_interactor(problem.interactor)
+            logger.debug("Added |Interactor| and |Run| tag to cats.xml")
+
+    # TODO: Need copy module files
+    # print("LOG: Copied |module| files to cats package")
+    cats.add_modules(problem.resources)
+    logger.debug("Added modules files")
+
+    with report.span("generators"):
+        logger.debug("Started adding |Generator| to cats.xml")
+        main_testset = choose_testset(problem.judging.test_sets)
+        generators = get_generators(problem.executables, main_testset.tests)
+        cop.generators(generators)
+        logger.debug("Copied |generator| files to cats package")
+        for generator in generators:
+            cats.add_generator(generator)
+        logger.debug("Finished adding |Generator| tag to cats.xml")
+
+    with report.span("tests"):
+        logger.debug("Started adding |Test| to cats.xml")
+        tests_path = cop.tests(main_testset, dedup=dedup)
+        logger.debug("Copied |test| files to cats package")
+        if dedup:
+            logger.info(f"Deduplicated |test| files: {cop.dedup_report}")
+        cats.add_all_test_out(main_testset)
+        for i, test in enumerate(main_testset.tests):
+            cats.add_test_in(i + 1, test, tests_path, cop.aliases)
+        logger.debug("Finished adding |Test| to cats.xml")
+
+    with report.span("groups"):
+        if main_testset.groups:
+            groups = get_groups_tests(main_testset)
+            for group in main_testset.groups:
+                cats.add_group(group, groups[group.name])
+
+        else:
+            logger.info("No groups found")
+
+    cats.add_label()
+    logger.debug("Added comments to xml")
+
+    with report.span("copy"):
+        cop.join()
+        logger.debug("Finished copying files to cats package")
+
+    with report.span("save"):
+        cats.save(cfg.result_xml, cop.target)
+        logger.debug("Saved cats.xml")
@@ -0,0 +1,82 @@
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import config as cfg
+from parser.source import PackageSource, open_source
+from writer.engine import CopyEngine, CopyJob
+from writer.target import PackageTarget
+
+__all__ = ["MANIFEST_NAME", "Delta", "load_manifest", "make_delta"]
+
+MANIFEST_NAME = Path("delta.json")
+
+
+@dataclass
+class Delta:
+    """Files of CATS package which were added, changed or removed since the base package."""
+    added: list[str]
+    changed: list[str]
+    removed: list[str]
+    unchanged: int
+    bytes: int
+    # Dir or archive of the delta.
+    path: Path | None = None
+
+    def __str__(self) -> str:
+        return (f"{len(self.added)} added, {len(self.changed)} changed, "
+                f"{len(self.removed)} removed, {self.unchanged} unchanged files, "
+                f"{self.bytes} bytes")
+
+
+def _files(source: PackageSource, path: Path = Path(".")) -> list[Path]:
+    files = []
+    for el in source.iterdir(path):
+        if source.is_dir(el):
+            files.extend(_files(source, el))
+        else:
+            files.append(el)
+    return files
+
+
+def _manifest(engine: CopyEngine) -> dict[str, dict]:
+    """Return {local path: {"size", "sha256"}} for all files of the source."""
+    paths = _files(engine.source)
+    return {path.as_posix(): {"size": engine.source.size(path), "sha256": digest}
+            for path, digest in zip(paths, engine.digests(paths))}
+
+
+def load_manifest(base_path: Path, workers: int = cfg.io_workers) -> dict[str, dict]:
+    """
+    Return the manifest of the base CATS package: dir or zip of the package,
+    delta.json of the previous delta or dir of the previous delta.
+    """
+    base_path = Path(base_path)
+    if base_path.is_dir() and (base_path / MANIFEST_NAME).is_file():
+        base_path = base_path / MANIFEST_NAME
+    if base_path.is_file() and base_path.suffix == ".json":
+        return json.loads(base_path.read_text())["files"]
+    with open_source(base_path) as source:
+        # Only the digests are computed, the engine has no target.
+        return _manifest(CopyEngine(source, PackageTarget(), workers))
+
+
+def make_delta(base: dict[str, dict], source: PackageSource, target: PackageTarget,
+               base_name: str = "", workers: int = cfg.io_workers) -> Delta:
+    """
+    Write the added and changed files of CATS package to the target with delta.json:
+    the lists of added, changed and removed files and the manifest of the whole package,
+    which is the base of the next delta.
+    """
+    engine = CopyEngine(source, target, workers)
+    files = _manifest(engine)
+    added = sorted(files.keys() - base.keys())
+    removed = sorted(base.keys() - files.keys())
+    changed = sorted(path for path in files.keys() & base.keys()
+                     if files[path]["sha256"] != base[path]["sha256"])
+    engine.run([CopyJob(Path(path), Path(path)) for path in added + changed])
+    target.write_bytes(MANIFEST_NAME, json.dumps(
+        {"version": cfg.version, "base": base_name, "added": added, "changed": changed,
+         "removed": removed, "files": files}, indent=2).encode())
+    return Delta(added, changed, removed, len(files) - len(added) - len(changed),
+                 sum(files[path]["size"] for path in added + changed))
@@ -1,141 +1,115 @@
+import json
 import logging
-from sys import argv
+from argparse import ArgumentParser
 from pathlib import Path
-from shutil import unpack_archive, rmtree
+from typing import TYPE_CHECKING
 
 import config as cfg
-from parser.problem import Problem
-from parser.services import get_properties
+from converter import Options, Result, convert, plan
+from writer.placement import STRATEGIES
 
-from writer.xmler import CatsXml
-from writer.utils import *
-from writer.files import Copier
+if TYPE_CHECKING:
+    from writer.plan import PlanTarget
 
-if len(argv) > 1:
-    file_path = Path(argv[1])
-else:
-    file_path = Path(input("Please, Enter path to polygon package dir or zip\n"))
-
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter(fmt='[%(asctime)s: %(levelname)s] %(message)s'))
-logging.root.addHandler(handler)
+__all__ = ["add_options", "setup_logging", "find_package", "print_report", "print_plan"]
 
 logger = logging.getLogger("main")
 
-for fp in map(lambda el: el / file_path, cfg.search_dir):
-    if fp.exists():
-        file_path = fp
-        logger.info(f"Path found: {file_path}")
-        break
-else:
+
+def add_options(arg_parser: ArgumentParser) -> None:
+    """Add the conversion options to command line arguments."""
+    arg_parser.add_argument("--zip", action="store_true",
+                            help="save CATS package as *.zip archive")
+    arg_parser.add_argument("--compress-level", type=int, choices=range(10), metavar="0-9",
+                            help="compression level of *.zip archive")
+    arg_parser.add_argument("--dedup", action="store_true",
+                            help="copy identical test files once and share them between tests")
+    arg_parser.add_argument("--force", action="store_true",
+                            help="convert package even if it is found in the conversion cache")
+    arg_parser.add_argument("--placement", choices=["auto", *STRATEGIES], default=cfg.placement,
+                            help="how files of unpacked package are placed to CATS package dir")
+    arg_parser.add_argument("--io-workers", type=int, default=cfg.io_workers,
+                            help="number of threads copying files")
+    arg_parser.add_argument("--stream-xml", action="store_true",
+                            help="write cats.xml as tags are added, for very large test sets")
+    arg_parser.add_argument("--stream-parse", action="store_true",
+                            help="parse problem.xml incrementally and read tests lazily")
+    arg_parser.add_argument("--overlap", action="store_true",
+                            help="copy files in the background while cats.xml is built")
+    arg_parser.add_argument("--report", choices=["log", "json"],
+                            help="report time, files and bytes of each stage: to log or as json")
+    arg_parser.add_argument("--profile", choices=["cpu", "mem"],
+                            help="profile each stage by cProfile or tracemalloc, "
+                                 "saved to <short-name>.profile next to the result")
+
+
+def setup_logging(level: int = cfg.log_level) -> None:
+    """Add the console handler to the root logger."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(fmt='[%(asctime)s: %(levelname)s] %(message)s'))
+    logging.root.addHandler(handler)
+    logging.root.setLevel(level)
+
+
+def print_report(result: Result, mode: str | None) -> None:
+    """Log the report of the conversion or print it as json."""
+    if result.report is None:
+        return
+    match mode:
+        case "log":
+            result.report.log()
+        case "json":
+            print(result.report.to_json(), flush=True)
+
+
+def print_plan(package_plan: "PlanTarget", mode: str | None) -> None:
+    """Print the files of the planned CATS package and their total size, or the plan as json."""
+    if mode == "json":
+        print(json.dumps(package_plan.to_dict()), flush=True)
+        return
+    for job in sorted(package_plan.jobs, key=lambda el: el.result_path):
+        print(f"{job.size:12}  {job.result_path.as_posix()} <- {job.path.as_posix()}")
+    for path, data in package_plan.contents.items():
+        print(f"{len(data):12}  {path.as_posix()}")
+    print(f"{package_plan.files} files, {package_plan.bytes} bytes to {package_plan.path}",
+          flush=True)
+
+
+def find_package(file_path: Path) -> Path:
+    """Search the polygon package in config/search_dirs."""
+    for fp in map(lambda el: el / file_path, cfg.search_dir):
+        if fp.exists():
+            logger.info(f"Path found: {fp}")
+            return fp
     raise AttributeError(f"Path `{file_path}` doesn't exist")
 
 
-logger.info(f"Started processing polygon package ({file_path})")
-was_unpacked = False
-original_file_path = file_path
-if file_path.is_file() and file_path.suffix == ".zip":
-    logger.debug("Package is archive")
-    file_path = cfg.unpack_dir / file_path.stem
-    unpack_archive(original_file_path, extract_dir=cfg.unpack_dir / file_path.name)
-    was_unpacked = True
-    logger.debug("Archive unpacked")
-
-elif not file_path.is_dir():
-    raise AttributeError("Path for converter must be |zip| or |dir| of polygon package")
-
-problem = Problem(file_path / "problem.xml")
-logger.debug("Parsed polygon/|problem.xml| ")
-
-statements_properties = get_properties(problem)
-# print(statements_properties)
-logger.debug("Finished parse all polygon/.../|problem-properties.json|")
-
-logger.info("Started to create cats.xml")
-cats = CatsXml()
-
-cats.set_title(problem, main_properties := choose_properties(statements_properties))
-logger.debug("Set attributes for <Problem> tag of cats.xml")
-
-cop = Copier(file_path, result_root := cfg.result_dir / problem.problem.attrib["short-name"])
-logger.info(f"Created |Directory| for cats package ({result_root})")
-
-# TODO: Add multy language resources
-resources = cop.statement_resources(main_properties)
-logger.debug("Copied |resource| files to cats package")
-cats.add_resources(resources)
-logger.debug("Added |Picture| and |Attachment| tags to cats.xml")
-
-logger.debug("Started adding |problem-properties.json| to cats.xml")
-st_count = len(statements_properties)
-for i, st_properties in enumerate(statements_properties):
-    cats.add_txt_by_properties(st_properties)
-    logger.debug(f"Added |{st_properties.language}|/problem-properties.json "
-                 f"({i + 1}/{st_count}) to cats.xml")
-logger.debug("Finished adding |problem-properties.json| to cats.xml")
-
-inp_path, ans_path = cop.samples(main_properties)
-logger.debug("Copied |sample| files to cats package")
-cats.add_samples_by_properties(main_properties,
-                               use_file=True, local_in=inp_path, local_ans=ans_path)
-logger.debug("Added |samples| to cats.xml")
-
-cats.import_testlib()
-logger.debug("Added import tags for use |testlib| to cats.xml")
-
-cop.checker(problem.checker)
-logger.debug("Copied |checker| file to cats package")
-cats.set_checker(problem.checker)
-logger.debug("Added |Checker| tag to cats.xml")
-
-cop.solutions(problem.solutions)
-logger.debug("Started adding |Solution| tag to cats.xml")
-cats.add_solutions(problem.solutions)
-logger.debug("Finished adding |Solution| tag to cats.xml")
-
-if problem.is_interactive:
-    logger.debug("Package is interactive")
-    cop.interactor(problem.interactor)
-    logger.debug("Copied |interactor| file to cats package")
-    cats.use_interactor(problem.interactor)
-    logger.debug("Added |Interactor| and |Run| tag to cats.xml")
-
-# TODO: Need copy module files
-# print("LOG: Copied |module| files to cats package")
-cats.add_modules(problem.resources)
-logger.debug("Added modules files")
-
-logger.debug("Started adding |Generator| to cats.xml")
-main_testset = choose_testset(problem.judging.test_sets)
-generators = get_generators(problem.executables, main_testset.tests)
-cop.generators(generators)
-logger.debug("Copied |generator| files to cats package")
-for generator in generators:
-    cats.add_generator(generator)
-logger.debug("Finished adding |Generator| tag to cats.xml")
-
-logger.debug("Started adding |Test| to cats.xml")
-tests_path = cop.tests()
-logger.debug("Copied |test| files to cats package")
-cats.add_all_test_out(main_testset)
-for i, test in enumerate(main_testset.tests):
-    cats.add_test_in(i + 1, test, tests_path)
-logger.debug("Finished adding |Test| to cats.xml")
-
-if main_testset.groups:
-    groups = get_groups_tests(main_testset)
-    for group in main_testset.groups:
-        cats.add_group(group, groups[group.name])
-
-else:
-    logger.info("No groups found")
-
-cats.add_label()
-logger.debug("Added comments to xml")
-
-if was_unpacked:
-    rmtree(file_path)
-    logger.info("Unpacked dir deleted")
-result_path = cop.result / cfg.result_xml
-cats.save(result_path)
-logger.info(f"INFO: Finished processing polygon package. Save to {result_path}")
+if __name__ == '__main__':
+    arg_parser = ArgumentParser(description="Convert polygon package to CATS package")
+    arg_parser.add_argument("package", nargs="?", type=Path,
+                            help="path to polygon package dir or zip")
+    arg_parser.add_argument("-o", "--output", type=Path,
+                            help="dir of CATS packages, config/result_dir by default")
+    add_options(arg_parser)
+    arg_parser.add_argument("--delta-from", type=Path, metavar="PREVIOUS",
+                            help="also save the changes since the previous CATS package "
+                                 "(dir, zip or delta.json) to <short-name>.delta")
+    arg_parser.add_argument("--dry-run", action="store_true",
+                            help="print the files of CATS package and their size, "
+                                 "nothing is written")
+    arg_parser.add_argument("--watch", action="store_true",
+                            help="convert unpacked package again on every change of its files")
+    args = arg_parser.parse_args()
+    if args.package is None:
+        args.package = Path(input("Please, Enter path to polygon package dir or zip\n"))
+
+    setup_logging()
+    if args.dry_run:
+        print_plan(plan(find_package(args.package), args.output, Options.from_args(args)),
+                   args.report)
+    elif args.watch:
+        from watch import Watcher
+        Watcher(find_package(args.package), Options.from_args(args), args.output).run()
+    else:
+        print_report(convert(find_package(args.package), args.output, Options.from_args(args),
+                             args.delta_from), args.report)
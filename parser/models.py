@@ -1,10 +1,13 @@
 from pathlib import Path
+from array import array
 from dataclasses import dataclass, field as dtField
+from itertools import compress
+from typing import Iterator
 import config as cfg
 
-__all__ = ["PolygonTag", "NameTag", "TexTag", "StatementTag", "TutorialTag", "TestTag", "GroupTag",
-           "TestSetTag", "JudgingTag", "SourceTag", "ResourceTag", "ExecutableTag", "CheckerTag",
-           "InteractorTag", "ValidatorTag", "SolutionTag", "Tag"]
+__all__ = ["PolygonTag", "NameTag", "TexTag", "StatementTag", "TutorialTag", "TestTag", "TestRow",
+           "TestTable", "GroupTag", "TestSetTag", "JudgingTag", "SourceTag", "ResourceTag",
+           "ExecutableTag", "CheckerTag", "InteractorTag", "ValidatorTag", "SolutionTag", "Tag"]
 
 
 # TODO: Add types validation
@@ -58,11 +61,135 @@ class TestTag(PolygonTag):
 
     def __post_init__(self):
         self.sample = self.sample == "true"
-        self.generator = self.cmd.split()[0] if self.cmd else None
-        self.params = " ".join(self.cmd.split()[1:]) if self.cmd else None
+        self.generator, self.params = _split_cmd(self.cmd)
         self.is_generated = self.method == "generated"
 
 
+def _split_cmd(cmd: str | None) -> tuple[str | None, str | None]:
+    """Split generator command to the generator name and its params."""
+    if not cmd:
+        return None, None
+    generator, *params = cmd.split()
+    return generator, " ".join(params)
+
+
+class _Interned:
+    """Distinct values of a column, the column keeps their ids."""
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def id(self, value) -> int:
+        if value is None:
+            return -1
+        if (i := self.ids.get(value)) is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def value(self, i: int):
+        return None if i < 0 else self.values[i]
+
+
+class TestRow:
+    """Read-only view of one test of TestTable with the same fields as TestTag."""
+    __slots__ = ("method", "sample", "points", "description", "group", "from_file",
+                 "generator", "params", "is_generated")
+
+    def __init__(self, table: "TestTable", i: int):
+        self.method = table._methods.value(table._method[i])
+        self.sample = bool(table._sample[i])
+        self.points = table._points.value(table._point[i])
+        self.group = table._groups.value(table._group[i])
+        self.generator = table._generators.value(table._generator[i])
+        self.params = table._params[i]
+        self.description = table._descriptions.get(i)
+        self.from_file = table._from_files.get(i)
+        self.is_generated = self.method == "generated"
+
+    @property
+    def cmd(self) -> str | None:
+        if self.generator is None:
+            return None
+        return f"{self.generator} {self.params}" if self.params else self.generator
+
+    def __repr__(self):
+        return f"TestRow(method={self.method!r}, group={self.group!r}, cmd={self.cmd!r})"
+
+
+class TestTable:
+    """
+    Compact column storage of judging/testset/<tests>.
+    Method, sample flag, points, group and generator are array columns of interned values ids,
+    rare description and from-file attributes are kept by index.
+    """
+    __slots__ = ("_methods", "_points", "_groups", "_generators", "_method", "_sample",
+                 "_point", "_group", "_generator", "_params", "_descriptions", "_from_files")
+
+    def __init__(self):
+        self._methods, self._points, self._groups, self._generators = \
+            _Interned(), _Interned(), _Interned(), _Interned()
+        self._method = array("b")
+        self._sample = bytearray()
+        self._point = array("i")
+        self._group = array("i")
+        self._generator = array("i")
+        self._params: list[str | None] = []
+        self._descriptions: dict[int, str] = {}
+        self._from_files: dict[int, str] = {}
+
+    def append(self, method: str, sample: str | bool = False, cmd: str = None, points: str = None,
+               description: str = None, group: str = None, from_file: str = None) -> None:
+        """Add the test by attributes of <test> tag."""
+        i = len(self._method)
+        generator, params = _split_cmd(cmd)
+        self._method.append(self._methods.id(method))
+        self._sample.append(sample is True or sample == "true")
+        self._point.append(self._points.id(points))
+        self._group.append(self._groups.id(group))
+        self._generator.append(self._generators.id(generator))
+        self._params.append(params)
+        if description is not None:
+            self._descriptions[i] = description
+        if from_file is not None:
+            self._from_files[i] = from_file
+
+    def __len__(self) -> int:
+        return len(self._method)
+
+    def __getitem__(self, i: int) -> TestRow:
+        if not -len(self) <= i < len(self):
+            raise IndexError("TestTable index out of range")
+        return TestRow(self, i % len(self))
+
+    def __iter__(self) -> Iterator[TestRow]:
+        return (TestRow(self, i) for i in range(len(self)))
+
+    def tests_per_group(self) -> dict[str | None, list[int]]:
+        """Return ranks of tests of every group."""
+        ranks = [[] for _ in self._groups.values]
+        no_group = []
+        for rank, group in enumerate(self._group, 1):
+            (ranks[group] if group >= 0 else no_group).append(rank)
+        result = dict(zip(self._groups.values, ranks))
+        if no_group:
+            result[None] = no_group
+        return result
+
+    def distinct_generators(self) -> set[str]:
+        """Return names of generators used by generated tests."""
+        generated = self._methods.ids.get("generated")
+        return {self._generators.values[g]
+                for g in set(compress(self._generator, (m == generated for m in self._method)))
+                if g >= 0}
+
+    def sample_ranks(self) -> list[int]:
+        """Return ranks of sample tests."""
+        return list(compress(range(1, len(self) + 1), self._sample))
+
+
 @dataclass
 class GroupTag(PolygonTag):
     feedback_policy: str
@@ -81,7 +208,7 @@ class TestSetTag(PolygonTag):
     input_path_pattern: str
     answer_path_pattern: str
     output_path_pattern: str = None
-    tests: list[TestTag] = dtField(default_factory=list)
+    tests: TestTable = dtField(default_factory=TestTable)
     groups: list[GroupTag] = dtField(default_factory=list)
 
 
@@ -114,6 +241,8 @@ class SourceTag(PolygonTag):
 @dataclass
 class ResourceTag(SourceTag):
     type: cfg.Compiler | None = None
+    # Language of statement resource which differs between statement languages.
+    lang: str | None = None
     is_picture: bool = dtField(init=False)
 
     def __post_init__(self):
@@ -1,11 +1,13 @@
 from pathlib import Path
+from typing import BinaryIO, Iterator
 import xml.etree.ElementTree as ET
 
 from parser.models import *
 from parser.services import pre_attrib
+from parser.source import PackageSource, DirSource
 from core import *
 
-__all__ = ["Problem"]
+__all__ = ["Problem", "LazyTests"]
 
 
 class _Parser(Logged):
@@ -25,9 +27,12 @@ class _Parser(Logged):
         return [TutorialTag(**tutorial.attrib) for tutorial in tutorials_node]
 
     @classmethod
-    def tests(cls, tests_node: ET.Element) -> list[TestTag]:
+    def tests(cls, tests_node: ET.Element) -> TestTable:
         """Parse judging/testset/<tests> node from problem.xml"""
-        return [TestTag(**pre_attrib(tests_node[i].attrib)) for i in range(len(tests_node))]
+        tests = TestTable()
+        for test in tests_node:
+            tests.append(**pre_attrib(test.attrib))
+        return tests
 
     @classmethod
     def groups(cls, groups_node: ET.Element) -> list[GroupTag]:
@@ -43,7 +48,7 @@ class _Parser(Logged):
                     cls.logger.warning(f"In <group> tag found <{el.tag}>, must be <dependencies>")
                     continue
                 dep = list(map(lambda g: g.attrib["group"], sub_el))
-            groups.append(GroupTag(**el.attrib, dependencies=dep))
+            groups.append(GroupTag(**pre_attrib(el.attrib), dependencies=dep))
         return groups
 
     @classmethod
@@ -160,41 +165,156 @@ class _Parser(Logged):
         return [Tag(**el.attrib) for el in tags_node]
 
 
+class LazyTests(Logged):
+    """
+    Tests of judging/testset/<tests> which are read from problem.xml on every iteration.
+    Only one <test> tag is kept in memory at a time.
+    """
+
+    def __init__(self, source: PackageSource, problem_path: Path, test_set_index: int, count: int):
+        self.source = source
+        self.problem_path = problem_path
+        self.test_set_index = test_set_index
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[TestTag]:
+        test_set_index = -1
+        stack = []
+        with self.source.open(self.problem_path) as problem_file:
+            for event, el in ET.iterparse(problem_file, events=("start", "end")):
+                if event == "start":
+                    stack.append(el)
+                    if el.tag == "testset" and len(stack) == 3:
+                        test_set_index += 1
+                    continue
+                stack.pop()
+                if el.tag == "test" and len(stack) == 4 and test_set_index == self.test_set_index:
+                    yield TestTag(**pre_attrib(el.attrib))
+                elif el.tag == "tests" and len(stack) == 3 \
+                        and test_set_index == self.test_set_index:
+                    return
+                if stack:
+                    stack[-1].remove(el)
+
+    def tests_per_group(self) -> dict[str | None, list[int]]:
+        """Return ranks of tests of every group."""
+        ranks = {}
+        for rank, test in enumerate(self, 1):
+            ranks.setdefault(test.group, []).append(rank)
+        return ranks
+
+    def distinct_generators(self) -> set[str]:
+        """Return names of generators used by generated tests."""
+        return {test.generator for test in self if test.is_generated}
+
+    def sample_ranks(self) -> list[int]:
+        """Return ranks of sample tests."""
+        return [rank for rank, test in enumerate(self, 1) if test.sample]
+
+
 class Problem(Logged):
-    def __init__(self, problem_path: Path):
+    def __init__(self, problem_path: Path, source: PackageSource = None, stream: bool = False):
+        """
+        Parse problem.xml of polygon package.
+        Without source problem_path is the path to problem.xml on disk,
+        otherwise it is the local path of problem.xml in the source package.
+        In stream mode tags are cleared as soon as they are parsed,
+        and the tests of test sets are read lazily (see LazyTests).
+        """
         super().__init__()
-        if not problem_path.is_file() or not problem_path.with_suffix(".xml"):
+        problem_path = Path(problem_path)
+        if source is None:
+            source = DirSource(problem_path.parent)
+            local_path = Path(problem_path.name)
+        else:
+            local_path = problem_path
+        if not source.is_file(local_path) or local_path.suffix != ".xml":
             raise ValueError("Path of problem.xml must be .xml file, but found:", problem_path)
-        self._tree = ET.parse(problem_path)
-        self.logger.debug(f"problem.xml is parsed ({problem_path})")
-        self._problem = self._tree.getroot()
-        self._path = problem_path if type(problem_path) is Path else Path(problem_path)
+        self._path = problem_path
+        self._source = source
         self._names = self._statements = self._tutorials = self._judging = self._resources =\
             self._executables = self._checker = self._interactor = self._validators =\
             self._solutions = self._tags = None
-        self._parse()
+
+        with source.open(local_path) as problem_file:
+            if stream:
+                self._tree = None
+                self._iterparse(problem_file, local_path)
+            else:
+                self._tree = ET.parse(problem_file)
+                self._problem = self._tree.getroot()
+                self._parse()
+        self.logger.debug(f"problem.xml is parsed ({problem_path})")
+
+    def __getstate__(self) -> dict:
+        """
+        The parsed tags without the package source and the xml tree,
+        only the attributes of the root <problem> tag are kept.
+        """
+        state = self.__dict__.copy()
+        state["_source"] = state["_tree"] = None
+        state["_problem"] = ET.Element(self._problem.tag, self._problem.attrib)
+        return state
+
+    def attach(self, source: PackageSource) -> "Problem":
+        """Set the package source of the unpickled problem."""
+        self._source = source
+        return self
 
     def _parse(self):
         """
         Iterate over the problem.xml tags and parse all required tags.
         """
         for el in self.problem:
-            match el.tag:
-                case "names":
-                    self._names = _Parser.names(el)
-                case "statements":
-                    self._statements = _Parser.statements(el)
-                case "tutorials":
-                    self._tutorials = _Parser.tutorials(el)
-                case "judging":
-                    self._judging = _Parser.judging(el)
-                case "files":
-                    self._resources, self._executables = _Parser.files(el)
-                case "assets":
-                    (self._checker, self._interactor,
-                     self._validators, self._solutions) = _Parser.assets(el)
-                case "tags":
-                    self._tags = _Parser.tags(el)
+            self._parse_tag(el)
+
+    def _iterparse(self, problem_file: BinaryIO, local_path: Path):
+        """
+        Parse problem.xml tags as soon as they are read and remove them from the tree.
+        Tests are skipped and replaced with LazyTests.
+        """
+        stack = []
+        tests_counts = []
+        for event, el in ET.iterparse(problem_file, events=("start", "end")):
+            if event == "start":
+                if not stack:
+                    self._problem = el
+                elif el.tag == "testset" and len(stack) == 2:
+                    tests_counts.append(0)
+                stack.append(el)
+                continue
+            stack.pop()
+            if len(stack) == 1:
+                self.problem.remove(self._parse_tag(el))
+            elif el.tag == "test" and len(stack) == 4:
+                tests_counts[-1] += 1
+                stack[-1].remove(el)
+
+        if self._judging is not None:
+            for i, test_set in enumerate(self._judging.test_sets):
+                test_set.tests = LazyTests(self._source, local_path, i, tests_counts[i])
+
+    def _parse_tag(self, el: ET.Element) -> ET.Element:
+        match el.tag:
+            case "names":
+                self._names = _Parser.names(el)
+            case "statements":
+                self._statements = _Parser.statements(el)
+            case "tutorials":
+                self._tutorials = _Parser.tutorials(el)
+            case "judging":
+                self._judging = _Parser.judging(el)
+            case "files":
+                self._resources, self._executables = _Parser.files(el)
+            case "assets":
+                (self._checker, self._interactor,
+                 self._validators, self._solutions) = _Parser.assets(el)
+            case "tags":
+                self._tags = _Parser.tags(el)
+        return el
 
     @property
     def problem(self) -> ET.Element:
@@ -307,9 +427,13 @@ class Problem(Logged):
         return []
 
     @property
-    def path(self):
+    def path(self) -> Path:
         return self._path
 
+    @property
+    def source(self) -> PackageSource:
+        return self._source
+
 
 if __name__ == '__main__':
     p = Problem(Path(input("Enter path to polygon problem.xml\n")))
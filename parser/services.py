@@ -12,7 +12,7 @@ __all__ = ["get_properties", "pre_attrib"]
 def get_properties(problem: "Problem") -> list["StatementProperties"]:
     return [from_file_properties(
         statement_tag.path.parent / "problem-properties.json",
-        statement_tag.charset, root_dir=problem.path.parent)
+        statement_tag.charset, source=problem.source)
             for statement_tag in problem.statements if statement_tag.type == "application/x-tex"]
 
 
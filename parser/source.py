@@ -0,0 +1,181 @@
+import os
+import struct
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path, PurePosixPath
+from shutil import copy, copyfileobj
+from typing import BinaryIO, Iterator
+from zipfile import BadZipFile, ZipFile, ZipInfo
+
+from core import Logged
+
+__all__ = ["PackageSource", "DirSource", "ZipSource", "open_source"]
+
+COPY_BUFFER = 1024 * 1024
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+LOCAL_HEADER_SIZE = 30
+
+
+class PackageSource(Logged):
+    """Read-only access to the files of polygon package by their local paths."""
+
+    def open(self, path: Path) -> BinaryIO:
+        raise NotImplementedError
+
+    def is_file(self, path: Path) -> bool:
+        raise NotImplementedError
+
+    def is_dir(self, path: Path) -> bool:
+        raise NotImplementedError
+
+    def iterdir(self, path: Path) -> list[Path]:
+        """Return local paths of the dir content."""
+        raise NotImplementedError
+
+    def size(self, path: Path) -> int:
+        raise NotImplementedError
+
+    def checksum(self, path: Path) -> int | None:
+        """Return the checksum known without reading the file, if any."""
+        return None
+
+    def digest(self, path: Path) -> str:
+        """Return sha256 of the file content."""
+        h = sha256()
+        with self.open(path) as inp:
+            while chunk := inp.read(COPY_BUFFER):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def copy(self, path: Path, result_path: Path) -> None:
+        """Write the file to result_path."""
+        with self.open(path) as inp, open(result_path, "wb") as out:
+            copyfileobj(inp, out, COPY_BUFFER)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DirSource(PackageSource):
+    """Unpacked polygon package."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def full_path(self, path: Path) -> Path:
+        return self.root / path
+
+    def open(self, path: Path) -> BinaryIO:
+        return open(self.root / path, "rb")
+
+    def is_file(self, path: Path) -> bool:
+        return (self.root / path).is_file()
+
+    def is_dir(self, path: Path) -> bool:
+        return (self.root / path).is_dir()
+
+    def iterdir(self, path: Path) -> list[Path]:
+        return [Path(path) / el.name for el in sorted((self.root / path).iterdir())]
+
+    def size(self, path: Path) -> int:
+        return (self.root / path).stat().st_size
+
+    def copy(self, path: Path, result_path: Path) -> None:
+        copy(self.root / path, result_path)
+
+
+class ZipSource(PackageSource):
+    """Polygon package read in place from *.zip archive, without unpacking."""
+
+    def __init__(self, zip_path: Path):
+        self.path = Path(zip_path)
+        self.zip = ZipFile(self.path)
+        self._members: dict[str, ZipInfo] = {}
+        self._dirs: dict[str, set[str]] = {".": set()}
+
+        infos = [info for info in self.zip.infolist() if not info.is_dir()]
+        root = self._find_root(infos)
+        for info in infos:
+            local = PurePosixPath(info.filename)
+            if root not in local.parents:
+                continue
+            local = local.relative_to(root)
+            self._members[local.as_posix()] = info
+            child = local
+            for parent in local.parents:
+                self._dirs.setdefault(parent.as_posix(), set()).add(child.as_posix())
+                child = parent
+        self.logger.debug(f"Found {len(self._members)} files in archive ({self.path})")
+
+    @staticmethod
+    def _find_root(infos: list[ZipInfo]) -> PurePosixPath:
+        """Return the archive dir with problem.xml, packages may be zipped with a parent dir."""
+        problems = [PurePosixPath(info.filename) for info in infos
+                    if PurePosixPath(info.filename).name == "problem.xml"]
+        if not problems:
+            return PurePosixPath(".")
+        return min(problems, key=lambda p: len(p.parts)).parent
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return Path(path).as_posix()
+
+    def info(self, path: Path) -> ZipInfo:
+        try:
+            return self._members[self._key(path)]
+        except KeyError:
+            raise FileNotFoundError(f"File `{path}` not found in archive ({self.path})") from None
+
+    def open(self, path: Path) -> BinaryIO:
+        return self.zip.open(self.info(path))
+
+    def is_file(self, path: Path) -> bool:
+        return self._key(path) in self._members
+
+    def is_dir(self, path: Path) -> bool:
+        return self._key(path) in self._dirs
+
+    def iterdir(self, path: Path) -> list[Path]:
+        if not self.is_dir(path):
+            raise FileNotFoundError(f"Dir `{path}` not found in archive ({self.path})")
+        return [Path(el) for el in sorted(self._dirs[self._key(path)])]
+
+    def size(self, path: Path) -> int:
+        return self.info(path).file_size
+
+    def checksum(self, path: Path) -> int:
+        return self.info(path).CRC
+
+    @contextmanager
+    def open_raw(self, path: Path) -> Iterator[tuple[ZipInfo, BinaryIO]]:
+        """
+        Context manager of the member info and the archive file positioned
+        at the compressed data of the member, compress_size bytes long.
+        """
+        info = self.info(path)
+        with open(self.path, "rb") as inp:
+            inp.seek(info.header_offset)
+            header = inp.read(LOCAL_HEADER_SIZE)
+            if header[:4] != LOCAL_HEADER_SIGNATURE:
+                raise BadZipFile(f"Bad local header of `{path}` in archive ({self.path})")
+            name_length, extra_length = struct.unpack("<HH", header[26:30])
+            inp.seek(name_length + extra_length, os.SEEK_CUR)
+            yield info, inp
+
+    def close(self) -> None:
+        self.zip.close()
+
+
+def open_source(package_path: Path) -> PackageSource:
+    """Return the source for polygon package |zip| or |dir|."""
+    if package_path.is_file() and package_path.suffix == ".zip":
+        return ZipSource(package_path)
+    if package_path.is_dir():
+        return DirSource(package_path)
+    raise ValueError("Path for converter must be |zip| or |dir| of polygon package")
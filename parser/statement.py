@@ -1,10 +1,12 @@
 from pathlib import Path
 from json import load
+from io import TextIOWrapper
 # from pydantic import BaseModel
 from dataclasses import dataclass
 import re
 
 from parser.models import *
+from parser.source import PackageSource, DirSource
 from core import Logged
 
 __all__ = ["Statement", "StatementProperties", "from_file_properties", "parse_statement_resources"]
@@ -76,13 +78,17 @@ class StatementProperties:
 
 
 def from_file_properties(local_properties_path: Path, encoding: str,
-                         root_dir: Path = Path("")) -> StatementProperties:
-    with open(root_dir / local_properties_path, encoding=encoding) as prop_file:
+                         root_dir: Path = Path(""),
+                         source: PackageSource = None) -> StatementProperties:
+    if source is None:
+        source = DirSource(root_dir)
+    with TextIOWrapper(source.open(local_properties_path), encoding=encoding) as prop_file:
         return StatementProperties(**load(prop_file), path=local_properties_path)
 
 
 def parse_statement_resources(local_statement_dir: Path, samples_count: int,
-                              root_dir: Path = Path("")) -> list["ResourceTag"]:
+                              root_dir: Path = Path(""),
+                              source: PackageSource = None) -> list["ResourceTag"]:
     _services_files = {"problem-properties.json", "problem.tex", "input.tex", "interaction.tex",
                        "legend.tex", "name.tex", "notes.tex", "output.tex", "tutorial.tex",
                        "scoring.tex"}
@@ -91,9 +97,11 @@ def parse_statement_resources(local_statement_dir: Path, samples_count: int,
         _services_files.add("example.%02d" % i)
         _services_files.add("example.%02d.a" % i)
 
+    if source is None:
+        source = DirSource(root_dir)
     return [ResourceTag(path=local_statement_dir / file.name)
-            for file in (root_dir / local_statement_dir).iterdir()
-            if file.name not in _services_files]
+            for file in source.iterdir(local_statement_dir)
+            if file.name not in _services_files and source.is_file(file)]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,93 @@
+import cProfile
+import pstats
+import shutil
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from core import Logged
+
+__all__ = ["MODES", "PhaseProfiler"]
+
+MODES = ("cpu", "mem")
+TOP = 30
+TRACE_FRAMES = 5
+
+
+class PhaseProfiler(Logged):
+    """
+    Profile of every phase of the conversion: cProfile for cpu mode, tracemalloc for mem mode.
+    cProfile sees only the thread of the conversion, not the threads copying files;
+    tracemalloc sees the allocations of all threads.
+    """
+
+    def __init__(self, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"Profile mode must be one of {MODES}, but found: {mode}")
+        self.mode = mode
+        self.profiles: dict[str, cProfile.Profile] = {}
+        # Peak of traced memory and {traceback: [size, count]} of kept allocations by phase.
+        self.peaks: dict[str, int] = {}
+        self.allocations: dict[str, dict[str, list[int]]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Profile the block as the phase, phase may be entered many times."""
+        if self.mode == "cpu":
+            profile = self.profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+            return
+
+        # Only the allocations of the phase are traced, the memory allocated before is not.
+        tracemalloc.start(TRACE_FRAMES)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.peaks[name] = max(self.peaks.get(name, 0), peak)
+            allocations = self.allocations.setdefault(name, {})
+            for stat in snapshot.statistics("traceback"):
+                key = "\n".join(stat.traceback.format())
+                size_count = allocations.setdefault(key, [0, 0])
+                size_count[0] += stat.size
+                size_count[1] += stat.count
+
+    def _dump_cpu(self, root: Path) -> None:
+        for name, profile in self.profiles.items():
+            profile.dump_stats(root / f"{name}.pstats")
+            with open(root / f"{name}.txt", "w") as out:
+                pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(TOP)
+
+    def _dump_mem(self, root: Path) -> None:
+        for name, allocations in self.allocations.items():
+            top = sorted(allocations.items(), key=lambda el: el[1][0], reverse=True)[:TOP]
+            with open(root / f"{name}.txt", "w") as out:
+                out.write(f"Peak: {self.peaks[name]} bytes\n"
+                          f"Kept: {sum(el[0] for el in allocations.values())} bytes "
+                          f"in {sum(el[1] for el in allocations.values())} blocks\n")
+                for traceback, (size, count) in top:
+                    out.write(f"\n{size} bytes in {count} blocks\n{traceback}\n")
+
+    def dump(self, root: Path) -> Path:
+        """
+        Save the profile of every phase to the dir: <phase>.pstats and <phase>.txt
+        with the top functions for cpu mode, <phase>.txt with the peak and the top
+        allocations kept after the phase for mem mode.
+        """
+        root = Path(root)
+        # Files of the previous profile must not be mixed with the new ones.
+        shutil.rmtree(root, ignore_errors=True)
+        root.mkdir(parents=True)
+        if self.mode == "cpu":
+            self._dump_cpu(root)
+        else:
+            self._dump_mem(root)
+        self.logger.info(f"Profile saved to {root}")
+        return root
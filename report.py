@@ -0,0 +1,77 @@
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from profiler import PhaseProfiler
+    from writer.target import PackageTarget
+
+__all__ = ["Span", "Report"]
+
+logger = logging.getLogger("report")
+
+
+@dataclass
+class Span:
+    name: str
+    seconds: float = 0.0
+    files: int = 0
+    bytes: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Written bytes per second."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class Report:
+    """
+    Wall time, written files and bytes of every stage of the conversion.
+    Files and bytes are counted by the target, so the stages before it is set have none.
+    Every stage is profiled as the phase, if the profiler is set.
+    """
+
+    def __init__(self, package: str = "", profiler: "PhaseProfiler | None" = None):
+        self.package = package
+        self.target: "PackageTarget | None" = None
+        self.profiler = profiler
+        self.spans: dict[str, Span] = {}
+
+    def _counters(self) -> tuple[int, int]:
+        return (self.target.files, self.target.bytes) if self.target else (0, 0)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        """Add the time and writes of the block to the stage, stage may be entered many times."""
+        span = self.spans.setdefault(name, Span(name))
+        files, size = self._counters()
+        start = time.perf_counter()
+        try:
+            with self.profiler.phase(name) if self.profiler else nullcontext():
+                yield span
+        finally:
+            span.seconds += time.perf_counter() - start
+            end_files, end_size = self._counters()
+            span.files += end_files - files
+            span.bytes += end_size - size
+
+    def total(self) -> Span:
+        return Span("total", sum(el.seconds for el in self.spans.values()),
+                    sum(el.files for el in self.spans.values()),
+                    sum(el.bytes for el in self.spans.values()))
+
+    def to_dict(self) -> dict:
+        return {"package": self.package,
+                "stages": [asdict(el) for el in self.spans.values()],
+                "total": asdict(self.total())}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def log(self) -> None:
+        for span in (*self.spans.values(), self.total()):
+            logger.info(f"{span.name:>12}: {span.seconds:8.3f} s, {span.files:6} files, "
+                        f"{span.bytes:12} bytes, {span.throughput / 2 ** 20:8.1f} MiB/s")
@@ -0,0 +1,304 @@
+import json
+import logging
+import shutil
+import time
+from argparse import ArgumentParser
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, replace
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import cpu_count
+from pathlib import Path
+from tempfile import mkdtemp
+from threading import Lock
+from typing import BinaryIO
+from uuid import uuid4
+
+import main
+from converter import Options, convert
+from core import Logged
+
+__all__ = ["Job", "ServiceBusy", "ConversionService", "serve"]
+
+logger = logging.getLogger("server")
+
+MAX_UPLOAD = 512 * 1024 * 1024
+UPLOAD_BUFFER = 1024 * 1024
+JOB_TTL = 60 * 60
+
+
+@dataclass
+class Job:
+    id: str
+    dir: Path
+    future: Future
+    created: float
+    finished: float | None = None
+
+    @property
+    def status(self) -> str:
+        if not self.future.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() else "done"
+
+    def to_dict(self) -> dict:
+        res = {"id": self.id, "status": self.status}
+        if res["status"] == "failed":
+            res["error"] = repr(self.future.exception())
+        return res
+
+
+class ServiceBusy(Exception):
+    """All workers are busy and the queue is full."""
+
+
+def _init_worker(level: int) -> None:
+    if not logging.root.handlers:
+        main.setup_logging()
+    logging.root.setLevel(level)
+
+
+class ConversionService(Logged):
+    """
+    Conversions of uploaded polygon packages in the bounded process pool.
+    At most workers + queue_size jobs are pending, the next ones are rejected by ServiceBusy.
+    Jobs are removed with their files after job_ttl seconds since they are finished.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = 16, options: Options = None,
+                 work_dir: Path = None, job_ttl: float = JOB_TTL):
+        self.workers = workers or cpu_count()
+        self.queue_size = queue_size
+        # The result is sent as archive, each job has its own dir so the cache is not used.
+        self.options = replace(options or Options(), zip=True, use_cache=False)
+        # Only the temporary work dir is removed on close, the given one keeps other files.
+        self._own_work_dir = work_dir is None
+        self.work_dir = Path(work_dir or mkdtemp(prefix="polygon2cats-"))
+        self.job_ttl = job_ttl
+        self.jobs: dict[str, Job] = {}
+        self.done = self.failed = self.rejected = 0
+        # Uploads which are being read, they are counted as pending jobs.
+        self._uploading = 0
+        self._lock = Lock()
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                   initargs=(logging.root.level,))
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.future.done())
+
+    def _finished(self, job: Job) -> None:
+        with self._lock:
+            job.finished = time.time()
+            if job.future.exception():
+                self.failed += 1
+                self.logger.error(f"Job {job.id} failed: {job.future.exception()!r}")
+            else:
+                self.done += 1
+                self.logger.info(f"Job {job.id} done in {job.finished - job.created:.3f} s")
+
+    def _cleanup(self) -> None:
+        now = time.time()
+        for job in [job for job in self.jobs.values()
+                    if job.finished and now - job.finished > self.job_ttl]:
+            del self.jobs[job.id]
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def _reserve(self) -> None:
+        with self._lock:
+            self._cleanup()
+            if self.pending + self._uploading >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise ServiceBusy(f"{self.pending + self._uploading} jobs are pending")
+            self._uploading += 1
+
+    def _submit(self, package_path: Path, job_dir: Path) -> Future:
+        """Submit the conversion, the pool broken by a dead worker is created again."""
+        args = (convert, package_path, job_dir / "cats", self.options)
+        try:
+            return self._pool.submit(*args)
+        except BrokenProcessPool:
+            self.logger.error("Process pool is broken, it is created again")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._new_pool()
+            return self._pool.submit(*args)
+
+    def submit(self, body: BinaryIO, size: int) -> Job:
+        """
+        Queue the conversion of polygon package archive of size bytes read from body.
+        The capacity is checked before the body is read, it is written to the job file
+        by chunks.
+        """
+        self._reserve()
+        job_id = uuid4().hex
+        job_dir = self.work_dir / job_id
+        package_path = job_dir / "polygon.zip"
+        try:
+            if size <= 0:
+                raise ValueError("Body must be polygon package zip")
+            job_dir.mkdir(parents=True)
+            with open(package_path, "wb") as out:
+                left = size
+                while left > 0 and (chunk := body.read(min(left, UPLOAD_BUFFER))):
+                    if left == size and not chunk.startswith(b"PK"):
+                        raise ValueError("Body must be polygon package zip")
+                    out.write(chunk)
+                    left -= len(chunk)
+            if left:
+                raise ValueError(f"Body is truncated, {left} bytes are missing")
+            with self._lock:
+                future = self._submit(package_path, job_dir)
+                self.jobs[job_id] = job = Job(job_id, job_dir, future, time.time())
+        except BaseException:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise
+        finally:
+            with self._lock:
+                self._uploading -= 1
+        future.add_done_callback(lambda _: self._finished(job))
+        self.logger.info(f"Job {job_id} queued ({size} bytes)")
+        return job
+
+    def metrics(self) -> dict:
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job.status == "running")
+            pending = self.pending
+            return {"workers": self.workers, "queue_size": self.queue_size,
+                    "running": running, "queue_depth": pending - running,
+                    "done": self.done, "failed": self.failed, "rejected": self.rejected}
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+        if self._own_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+            return
+        for job in self.jobs.values():
+            shutil.rmtree(job.dir, ignore_errors=True)
+        self.jobs.clear()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    POST /convert             polygon package zip in the body, returns {"id", "status"}
+    POST /convert?wait=1      returns CATS package zip when it is converted
+    GET  /jobs/<id>           status of the job
+    GET  /jobs/<id>/result    CATS package zip
+    GET  /metrics             queue depth and counters of jobs
+    """
+    server: "ThreadingHTTPServer"
+
+    @property
+    def service(self) -> ConversionService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, data: dict, status: HTTPStatus = HTTPStatus.OK, headers: dict = None):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str, headers: dict = None):
+        self._send_json({"error": message}, status, headers)
+
+    def _send_result(self, job: Job):
+        if job.status != "done":
+            return self._send_error(HTTPStatus.CONFLICT, f"Job is {job.status}")
+        result_path = job.future.result().path
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", f'attachment; filename="{result_path.name}"')
+        self.send_header("Content-Length", str(result_path.stat().st_size))
+        self.end_headers()
+        with open(result_path, "rb") as inp:
+            shutil.copyfileobj(inp, self.wfile)
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if parts == ["metrics"]:
+            return self._send_json(self.service.metrics())
+        if len(parts) in (2, 3) and parts[0] == "jobs":
+            if (job := self.service.jobs.get(parts[1])) is None:
+                return self._send_error(HTTPStatus.NOT_FOUND, "Job is not found")
+            if len(parts) == 2:
+                return self._send_json(job.to_dict())
+            if parts[2] == "result":
+                return self._send_result(job)
+        self._send_error(HTTPStatus.NOT_FOUND, "Unknown path")
+
+    def do_POST(self):
+        path, _, query = self.path.partition("?")
+        if path.strip("/") != "convert":
+            return self._send_error(HTTPStatus.NOT_FOUND, "Unknown path")
+        size = int(self.headers.get("Content-Length") or 0)
+        if size > MAX_UPLOAD:
+            return self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                    f"Package is larger than {MAX_UPLOAD} bytes")
+        try:
+            job = self.service.submit(self.rfile, size)
+        except ServiceBusy as e:
+            # The body is not read, the connection can't be reused.
+            self.close_connection = True
+            return self._send_error(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": "5"})
+        except ValueError as e:
+            self.close_connection = True
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+        except Exception as e:
+            self.close_connection = True
+            logger.error(f"Job was not submitted: {e!r}")
+            return self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, repr(e))
+
+        if "wait=1" in query.split("&"):
+            try:
+                job.future.result()
+            except Exception as e:
+                return self._send_error(HTTPStatus.UNPROCESSABLE_ENTITY, repr(e))
+            return self._send_result(job)
+        self._send_json(job.to_dict(), HTTPStatus.ACCEPTED,
+                        {"Location": f"/jobs/{job.id}"})
+
+
+def serve(host: str, port: int, service: ConversionService) -> None:
+    """Serve the conversion service until KeyboardInterrupt."""
+    httpd = ThreadingHTTPServer((host, port), _Handler)
+    httpd.service = service
+    logger.info(f"Serving on http://{host}:{httpd.server_port}, work dir {service.work_dir}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    finally:
+        httpd.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    arg_parser = ArgumentParser(description="HTTP service converting polygon package zip to CATS")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("-j", "--jobs", type=int, default=cpu_count(),
+                            help="number of worker processes")
+    arg_parser.add_argument("--queue-size", type=int, default=16,
+                            help="number of waiting jobs, the next uploads get 503")
+    arg_parser.add_argument("--work-dir", type=Path,
+                            help="dir of uploaded and converted packages, temporary by default")
+    main.add_options(arg_parser)
+    args = arg_parser.parse_args()
+
+    main.setup_logging()
+    logging.root.setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    ConversionService.logger.setLevel(logging.INFO)
+    serve(args.host, args.port,
+          ConversionService(args.jobs, args.queue_size, Options.from_args(args),
+                            args.work_dir))
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules of the converter are imported from the project root.
+sys.path.insert(0, str(Path(__file__).parent.parent))
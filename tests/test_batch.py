@@ -0,0 +1,20 @@
+from batch import convert_all
+from benchmark import PackageParams, make_package
+from converter import Options, Result
+from writer.engine import CopyError
+
+
+def test_broken_package_does_not_stop_batch(tmp_path):
+    packages = []
+    for tests in (8, 12, 16):
+        root = tmp_path / f"polygon-{tests}"
+        packages.append(make_package(root, PackageParams(tests=tests, generators=0)))
+    # The manual test of the second package is referenced by problem.xml, but it is missing.
+    (packages[1] / "tests" / "04").unlink()
+
+    results = convert_all(packages, jobs=1, options=Options(use_cache=False),
+                          output=tmp_path / "cats")
+    assert isinstance(results[packages[1]], CopyError)
+    for path in (packages[0], packages[2]):
+        assert isinstance(results[path], Result)
+        assert results[path].path.is_file()
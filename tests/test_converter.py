@@ -0,0 +1,28 @@
+from benchmark import PackageParams, make_package
+from converter import Options, convert
+
+
+def test_delta_from_the_same_dir(tmp_path):
+    old = make_package(tmp_path / "old", PackageParams(tests=8, generators=0))
+    new = make_package(tmp_path / "new", PackageParams(tests=6, generators=0))
+    # The same problem without the last two tests.
+    problem_path = new / "problem.xml"
+    problem_path.write_text(problem_path.read_text().replace('"bench-6"', '"bench-8"'))
+    options = Options(use_cache=False)
+    package = convert(old, tmp_path / "cats", options).path.parent
+
+    delta = convert(new, tmp_path / "cats", options, delta_from=package).delta
+    assert delta.removed == ["tests/07", "tests/08"]
+    assert not (package / "tests" / "07").exists()
+
+
+def test_files_are_copied_by_one_stage(tmp_path):
+    package = make_package(tmp_path / "polygon", PackageParams(tests=12, generators=0))
+    report = convert(package, tmp_path / "cats", Options(use_cache=False)).report
+
+    # The stages only plan the copies, the files are copied together before cats.xml is saved.
+    spans = {el["name"]: el for el in report.to_dict()["stages"]}
+    assert all(span["files"] == 0 for name, span in spans.items() if name not in ("copy", "save"))
+    files = [el for el in (tmp_path / "cats" / "bench-12").rglob("*") if el.is_file()]
+    # Only cats.xml is written by the save stage.
+    assert spans["copy"]["files"] == len(files) - 1
@@ -0,0 +1,21 @@
+import pickle
+from pathlib import Path
+
+import pytest
+
+from parser.source import DirSource
+from writer.engine import CopyEngine, CopyError, CopyJob
+from writer.target import DirTarget
+
+
+def test_copy_error_is_pickled(tmp_path):
+    (tmp_path / "src").mkdir()
+    engine = CopyEngine(DirSource(tmp_path / "src"), DirTarget(tmp_path / "dst"))
+    with pytest.raises(CopyError) as error:
+        engine.run([CopyJob(Path("tests/04"), Path("tests/04"))])
+
+    restored = pickle.loads(pickle.dumps(error.value))
+    assert str(restored) == str(error.value)
+    [(job, e)] = restored.failures
+    assert job.path == Path("tests/04")
+    assert isinstance(e, FileNotFoundError)
@@ -0,0 +1,24 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from writer import placement
+from writer.placement import STRATEGIES, Placer
+
+
+@pytest.mark.parametrize("name, function", [("copy_file_range", "copy_file_range"),
+                                            ("sendfile", "sendfile")])
+def test_stopped_strategy_falls_back_to_copy(tmp_path, monkeypatch, name, function):
+    if not STRATEGIES[name]:
+        pytest.skip(f"{name} is not available")
+    # The syscall copies nothing without an error, as on procfs.
+    # Only the strategy sees it, shutil.copyfile of the fallback uses the real one.
+    monkeypatch.setattr(placement, "os", SimpleNamespace(**(vars(os) | {function: lambda *args: 0})))
+    data = os.urandom(1000)
+    (tmp_path / "src").write_bytes(data)
+
+    placer = Placer(name)
+    placer.place(tmp_path / "src", tmp_path / "dst")
+    assert (tmp_path / "dst").read_bytes() == data
+    assert placer.chain == ("copy",)
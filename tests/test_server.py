@@ -0,0 +1,66 @@
+import os
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+
+from benchmark import PackageParams, make_package
+from converter import Options
+from server import ConversionService, ServiceBusy
+from writer.engine import CopyError
+
+
+def _upload(tmp_path, tests: int, broken: bool = False) -> bytes:
+    package = make_package(tmp_path / f"polygon-{tests}",
+                           PackageParams(tests=tests, generators=0, zip=True))
+    if not broken:
+        return package.read_bytes()
+    # The manual test referenced by problem.xml is missing.
+    out = BytesIO()
+    with ZipFile(package) as inp, ZipFile(out, "w") as zf:
+        for info in inp.infolist():
+            if info.filename != "tests/04":
+                zf.writestr(info, inp.read(info))
+    return out.getvalue()
+
+
+def _submit(service: ConversionService, data: bytes):
+    return service.submit(BytesIO(data), len(data))
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ConversionService(1, 0, Options(), tmp_path / "work")
+    yield service
+    service.close()
+
+
+def test_failed_job_does_not_break_service(tmp_path, service):
+    failed = _submit(service, _upload(tmp_path, 8, broken=True))
+    with pytest.raises(CopyError):
+        failed.future.result()
+    done = _submit(service, _upload(tmp_path, 12))
+    assert done.future.result().path.is_file()
+
+
+def test_broken_pool_is_created_again(tmp_path, service):
+    # The worker dies, so the pool is broken.
+    service._pool.submit(os._exit, 1).exception()
+    job = _submit(service, _upload(tmp_path, 8))
+    assert job.future.result().path.is_file()
+
+
+def test_busy_service_does_not_read_body(tmp_path, service):
+    data = _upload(tmp_path, 8)
+    # Another upload is being read, it takes the only place.
+    service._uploading += 1
+    body = BytesIO(data)
+    with pytest.raises(ServiceBusy):
+        service.submit(body, len(data))
+    assert body.tell() == 0
+
+
+def test_not_zip_body_is_rejected(service):
+    with pytest.raises(ValueError):
+        _submit(service, b"not a zip")
+    assert service.jobs == {}
@@ -0,0 +1,31 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from parser import models
+from writer.stream import XmlStream
+from writer.xmler import CatsXml
+
+
+def _build(cats: CatsXml, tests: int) -> None:
+    for rank in range(1, tests + 1):
+        test = models.TestTag(method="manual", points=1) if rank % 3 else \
+            models.TestTag(method="generated", cmd=f"gen {rank}")
+        cats.add_test_in(rank, test, Path("tests"))
+    cats.add_group(models.GroupTag("icpc", "g1", "each-test", [], 10), list(range(1, tests + 1, 2)))
+    cats.add_label()
+
+
+# Children of <Problem> are written by batches, several batches are checked.
+@pytest.mark.parametrize("tests", [0, 1, 3 * XmlStream.batch_size + 1])
+def test_stream_save_is_the_same(tmp_path, tests):
+    cats = CatsXml()
+    _build(cats, tests)
+    cats.save(tmp_path / "problem.xml")
+
+    out = BytesIO()
+    stream_cats = CatsXml(stream=out)
+    _build(stream_cats, tests)
+    stream_cats.save()
+    assert out.getvalue() == (tmp_path / "problem.xml").read_bytes()
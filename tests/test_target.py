@@ -0,0 +1,50 @@
+import io
+import os
+from pathlib import Path
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+from parser.source import ZipSource
+from writer.target import FLAG_DATA_DESCRIPTOR, ZipTarget
+
+MEMBERS = {"tests/01": (ZIP_STORED, os.urandom(3000)),
+           "tests/02": (ZIP_DEFLATED, b"1 2\n" * 5000),
+           "problem.xml": (ZIP_DEFLATED, b"<problem/>")}
+
+
+class _Unseekable(io.RawIOBase):
+    """The archive written to the stream without seek has the data descriptors."""
+
+    def __init__(self, out: io.BytesIO):
+        self.out = out
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        return self.out.write(data)
+
+
+def test_zip_raw_copy(tmp_path):
+    data = io.BytesIO()
+    with ZipFile(_Unseekable(data), "w") as zf:
+        for name, (compress_type, content) in MEMBERS.items():
+            info = ZipInfo(name)
+            info.compress_type = compress_type
+            with zf.open(info, "w") as out:
+                out.write(content)
+    (tmp_path / "polygon.zip").write_bytes(data.getvalue())
+
+    with ZipSource(tmp_path / "polygon.zip") as source:
+        assert all(source.info(Path(name)).flag_bits & FLAG_DATA_DESCRIPTOR for name in MEMBERS)
+        with ZipTarget(tmp_path / "cats.zip") as target:
+            for name in MEMBERS:
+                target.write_from(source, Path(name), Path("cats") / name)
+
+    with ZipFile(tmp_path / "cats.zip") as zf:
+        assert zf.testzip() is None
+        for name, (compress_type, content) in MEMBERS.items():
+            info = zf.getinfo(f"cats/{name}")
+            # The member is copied as it is compressed.
+            assert info.compress_type == compress_type
+            assert not info.flag_bits & FLAG_DATA_DESCRIPTOR
+            assert zf.read(info) == content
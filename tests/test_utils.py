@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from writer.utils import cats_ranges
+
+
+def _shortest_ranges(ranks: list[int]) -> int:
+    """Length of the shortest encoding, every range of consecutive ranks is tried."""
+    def length(i: int, j: int) -> float:
+        if i == j:
+            return len(str(ranks[i]))
+        step = ranks[i + 1] - ranks[i]
+        if any(ranks[k + 1] - ranks[k] != step for k in range(i, j)):
+            return float("inf")
+        return len(f"{ranks[i]}-{ranks[j]}") + (0 if step == 1 else 1 + len(str(step)))
+
+    cost = [0] + [None] * len(ranks)
+    for j in range(len(ranks)):
+        cost[j + 1] = min(cost[i] + length(i, j) + 1 for i in range(j + 1))
+    return cost[-1] - 1
+
+
+def _expand(ranges: str) -> list[int]:
+    ranks = []
+    for part in ranges.split(","):
+        first, last, step = [*map(int, part.split("-")), None, None][:3]
+        ranks.extend(range(first, (last or first) + 1, step or 1))
+    return ranks
+
+
+@pytest.mark.parametrize("ranks, expected", [
+    ([], ""),
+    ([7], "7"),
+    ([1, 2, 3, 4], "1-4"),
+    ([1, 3, 5, 7], "1-7-2"),
+    ([1, 2, 4, 6, 8], "1,2-8-2"),
+    ([1, 2, 3, 10, 20, 30], "1-3,10-30-10"),
+])
+def test_cats_ranges(ranks, expected):
+    assert cats_ranges(ranks) == expected
+
+
+def test_cats_ranges_is_shortest():
+    rnd = random.Random(2024)
+    for _ in range(2000):
+        ranks = sorted(rnd.sample(range(1, 60), rnd.randint(1, 12)))
+        ranges = cats_ranges(ranks)
+        assert _expand(ranges) == ranks
+        assert len(ranges) == _shortest_ranges(ranks)
@@ -0,0 +1,29 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from writer.tex import tex2cats
+
+
+def _tex(txt: str) -> list[str]:
+    return [ET.tostring(el, encoding="unicode") for el in tex2cats(txt)]
+
+
+@pytest.mark.parametrize("txt, expected", [
+    ("", []),
+    ("a\n\nb", ["<p>a</p>", "<p>b</p>"]),
+    (r"a \textbf{b c} d", ["<p>a <b>b c</b> d</p>"]),
+    (r"a \textbf x yz", ["<p>a <b>x</b> yz</p>"]),
+    (r"a \emph xyz", ["<p>a <i>x</i>yz</p>"]),
+    ("a { b } c", ["<p>a b c</p>"]),
+    ("a % comment\n  b", ["<p>a b</p>"]),
+    ("``q'' <<r>> a--b", ["<p>“q” «r» a–b</p>"]),
+    (r"$a_{1}$ and $$\frac{1}{2}$$", [r"<p>$a_{1}$ and $$\frac{1}{2}$$</p>"]),
+    (r"\unknown{x} y", [r"<p>\unknown{x} y</p>"]),
+    (r"a\\b \% c", ["<p>a<br />b % c</p>"]),
+    ("\\begin{itemize}\n\\item one\n\n two \\item three\n\\end{itemize}",
+     ["<ul><li>one two</li><li>three</li></ul>"]),
+    (r"\includegraphics[width=5cm]{pic.png}", ['<p><img picture="pic.png" /></p>']),
+])
+def test_tex2cats(txt, expected):
+    assert _tex(txt) == expected
@@ -0,0 +1,120 @@
+import os
+import time
+from copy import deepcopy
+from pathlib import Path
+
+import config as cfg
+from converter import Options, convert_problem, open_target
+from core import Logged
+from parser.problem import Problem
+from parser.services import get_properties
+from parser.source import DirSource
+from report import Report
+from writer.files import Copier
+from writer.xmler import CatsXml
+
+__all__ = ["Watcher"]
+
+
+class Watcher(Logged):
+    """
+    Convert unpacked polygon package again on every change of its files.
+    Problem and statements properties are kept in memory and parsed again only when
+    problem.xml or problem-properties.json are changed, only changed files and files with
+    new result paths are copied.
+    cats.xml is always built again, it takes milliseconds.
+    """
+
+    def __init__(self, package_path: Path, options: Options = None, output: Path = None,
+                 interval: float = 0.5):
+        if not Path(package_path).is_dir():
+            raise ValueError(f"Only unpacked polygon package dir can be watched: {package_path}")
+        self.root = Path(package_path)
+        self.options = options or Options()
+        self.output = output
+        self.interval = interval
+        self.source = DirSource(self.root)
+        self.problem: Problem | None = None
+        self.properties = []
+        # Jobs of the last successful conversion, see Copier.previous.
+        self.copied: set[tuple[Path, Path]] = set()
+
+    def snapshot(self) -> dict[Path, tuple[int, int]]:
+        """Return mtime and size of every file of the package by local path."""
+        files = {}
+        dirs = [self.root]
+        while dirs:
+            with os.scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dirs.append(Path(entry.path))
+                    elif entry.is_file():
+                        stat = entry.stat()
+                        files[Path(entry.path).relative_to(self.root)] = \
+                            (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def convert(self, changed: set[Path] = None) -> Path:
+        """Convert the package, changed is None for the full conversion."""
+        if changed is None or Path("problem.xml") in changed:
+            self.problem = Problem(Path("problem.xml"), self.source,
+                                   stream=self.options.stream_parse)
+            changed = None
+        if changed is None or any(path.name == "problem-properties.json" for path in changed):
+            self.properties = get_properties(self.problem)
+
+        # Copier replaces paths of tags by the result ones, so the parsed problem is not changed.
+        problem = deepcopy(self.problem)
+        report = Report(str(self.root))
+        with open_target(problem.problem.attrib["short-name"], self.options,
+                         self.output) as target:
+            report.target = target
+            # Archive is written again as a whole.
+            cop = Copier(self.source, target, self.options.io_workers,
+                         None if self.options.zip else changed, previous=self.copied)
+            convert_problem(problem, self.properties, cop, CatsXml(),
+                            self.options.dedup, report)
+        self.copied = cop.copied
+        if self.options.report == "log":
+            report.log()
+        total = report.total()
+        self.logger.info(f"Converted in {total.seconds * 1000:.0f} ms, "
+                         f"{total.files} files written")
+        return target.path if self.options.zip else target.root / cfg.result_xml
+
+    def _wait_stable(self, files: dict) -> dict:
+        """Wait until the files are not being written anymore."""
+        while True:
+            time.sleep(self.interval)
+            if (current := self.snapshot()) == files:
+                return files
+            files = current
+
+    def run(self) -> None:
+        """Convert the package, then poll it and convert it again until KeyboardInterrupt."""
+        files = self.snapshot()
+        self.convert()
+        failed = False
+        self.logger.info(f"Watching {self.root}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(self.interval)
+                current = self.snapshot()
+                if current == files:
+                    continue
+                current = self._wait_stable(current)
+                changed = {path for path in current.keys() | files.keys()
+                           if current.get(path) != files.get(path)}
+                files = current
+                self.logger.info(f"Changed {len(changed)} files: "
+                                 + ", ".join(map(str, sorted(changed)[:5]))
+                                 + (", ..." if len(changed) > 5 else ""))
+                try:
+                    self.convert(None if failed else changed)
+                    failed = False
+                except Exception as e:
+                    # Files of the failed conversion may be not copied, so the next one is full.
+                    failed = True
+                    self.logger.error(f"Conversion failed: {e!r}")
+        except KeyboardInterrupt:
+            self.logger.info("Stopped watching")
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import config as cfg
+from core import Logged
+from parser.source import PackageSource
+from writer.target import PackageTarget
+
+__all__ = ["CopyJob", "CopyError", "CopyEngine"]
+
+
+@dataclass
+class CopyJob:
+    path: Path
+    result_path: Path
+    size: int = 0
+
+
+class CopyError(Exception):
+    """Some files were not copied, failures contains every failed job with its error."""
+
+    def __init__(self, failures: list[tuple[CopyJob, Exception]]):
+        self.failures = failures
+        super().__init__(f"{len(failures)} files were not copied: " + "; ".join(
+            f"{job.path} -> {job.result_path} ({e!r})" for job, e in failures))
+
+    def __reduce__(self):
+        # The error is sent from the worker processes of batch and server.
+        return CopyError, (self.failures,)
+
+
+class CopyEngine(Logged):
+    """Copy files from polygon package to CATS package in the bounded thread pool, largest first."""
+
+    def __init__(self, source: PackageSource, target: PackageTarget,
+                 workers: int = cfg.io_workers):
+        self.source = source
+        self.target = target
+        self.workers = workers if target.concurrent else 1
+
+    def _copy(self, job: CopyJob) -> Exception | None:
+        try:
+            self.target.write_from(self.source, job.path, job.result_path)
+        except Exception as e:
+            self.logger.error(f"File was not copied {job.path} -> {job.result_path}: {e!r}")
+            return e
+
+    def _map(self, func, items: list) -> list:
+        if self.workers <= 1 or len(items) <= 1:
+            return list(map(func, items))
+        with ThreadPoolExecutor(min(self.workers, len(items))) as pool:
+            return list(pool.map(func, items))
+
+    def digests(self, paths: list[Path]) -> list[str]:
+        """Return sha256 of the files of polygon package."""
+        return self._map(self.source.digest, paths)
+
+    def run(self, jobs: list[CopyJob]) -> None:
+        """Copy all files, then raise CopyError if some of them failed."""
+        for job in jobs:
+            try:
+                job.size = self.source.size(job.path)
+            except OSError:
+                job.size = 0  # the error is reported by the copy
+        jobs = sorted(jobs, key=lambda el: el.size, reverse=True)
+
+        errors = self._map(self._copy, jobs)
+        failures = [(job, e) for job, e in zip(jobs, errors) if e is not None]
+        if failures:
+            raise CopyError(failures)
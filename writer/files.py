@@ -1,94 +1,223 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from shutil import copy
 from typing import TYPE_CHECKING
 
+import config as cfg
+from parser.source import PackageSource, DirSource
 from parser.statement import parse_statement_resources
+from writer.engine import CopyJob, CopyError, CopyEngine
+from writer.target import PackageTarget, DirTarget
 
 if TYPE_CHECKING:
     from parser.models import *
     from parser.statement import StatementProperties
 
 
-__all__ = ["Copier"]
+__all__ = ["DedupReport", "Copier"]
 
 
-def copy_source(source: "SourceTag", source_root: Path, result_path: Path) -> Path:
-    copy(source_root / source.path, result_path)
-    if result_path.is_file():
-        return result_path
-    return result_path / source.path.name
+@dataclass
+class DedupReport:
+    files: int = 0
+    duplicates: int = 0
+    saved_bytes: int = 0
+
+    def __str__(self):
+        return f"{self.duplicates} of {self.files} files are duplicates, {self.saved_bytes} bytes saved"
 
 
 class Copier:
-    def __init__(self, source_root: Path, result_root: Path):
-        self.source = source_root
-        self.result = result_root
-        self.result.mkdir(parents=True, exist_ok=True)
+    def __init__(self, source_root: Path | PackageSource, result_root: Path | PackageTarget,
+                 io_workers: int = cfg.io_workers, changed: set[Path] = None,
+                 background: bool = False, previous: set[tuple[Path, Path]] = None,
+                 hash_files: bool = True):
+        self.source = source_root if isinstance(source_root, PackageSource) \
+            else DirSource(source_root)
+        self.target = result_root if isinstance(result_root, PackageTarget) \
+            else DirTarget(result_root)
+        self.engine = CopyEngine(self.source, self.target, io_workers)
+        # With changed files, a job is skipped if the same file was copied to the same
+        # result path by the previous conversion (see copied) and it is not changed since.
+        self.changed = changed
+        self.previous = previous or set()
+        # (path, result path) of every job of this conversion, copied or skipped.
+        self.copied: set[tuple[Path, Path]] = set()
+        # Jobs of all stages are planned and copied by join in one run of the engine,
+        # the largest files first. With background the jobs of every stage are copied
+        # in the background thread one after another, join waits for them.
+        self.background = background
+        self._planned: list[CopyJob] = []
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: list[Future] = []
+        # Result paths of not copied duplicates to the result paths of their shared files.
+        self.aliases: dict[Path, Path] = {}
+        self.dedup_report = DedupReport()
+        # Without hashing only zip members with the same size and checksum are duplicates.
+        self.hash_files = hash_files
+
+    def _run(self, jobs: list[CopyJob]) -> None:
+        self.copied.update((job.path, job.result_path) for job in jobs)
+        if self.changed is not None:
+            jobs = [job for job in jobs if job.path in self.changed
+                    or (job.path, job.result_path) not in self.previous]
+        if not self.background:
+            self._planned.extend(jobs)
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="copier")
+        self._pending.append(self._executor.submit(self.engine.run, jobs))
+
+    def join(self) -> None:
+        """
+        Copy the planned files and wait for the background copies,
+        then raise CopyError with all failed files.
+        """
+        failures = []
+        try:
+            if self._planned:
+                jobs, self._planned = self._planned, []
+                try:
+                    self.engine.run(jobs)
+                except CopyError as e:
+                    failures.extend(e.failures)
+            for future in self._pending:
+                try:
+                    future.result()
+                except CopyError as e:
+                    failures.extend(e.failures)
+        finally:
+            self.close()
+        if failures:
+            raise CopyError(failures)
+
+    def close(self) -> None:
+        """Drop the planned copies, cancel the background ones not started yet and wait for the others."""
+        self._planned.clear()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        self._pending.clear()
+
+    def _copy_sources(self, sources: list["SourceTag"], folder: Path = Path("")) -> None:
+        """Copy source files to the folder and set their paths to the result."""
+        self._run([CopyJob(src.path, folder / src.path.name) for src in sources])
+        for src in sources:
+            src.path = folder / src.path.name
 
     def checker(self, checker: "CheckerTag") -> None:
-        copy_source(checker, self.source, self.result)
-        checker.path = Path(checker.path.name)
+        self._copy_sources([checker])
 
     def interactor(self, interactor: "InteractorTag") -> None:
-        copy_source(interactor, self.source, self.result)
-        interactor.path = Path(interactor.path.name)
+        self._copy_sources([interactor])
 
     def generators(self, generators: list["ExecutableTag"],
                    folder: Path | str = "generators") -> None:
-        folder = Path(folder)
-        result_dir = self.result / folder
-        result_dir.mkdir(exist_ok=True)
-        for gen in generators:
-            copy_source(gen, self.source, result_dir)
-            gen.path = folder / gen.path.name
+        self._copy_sources(generators, Path(folder))
 
     def solutions(self, solutions: list["SolutionTag"], folder: Path | str = "solutions") -> None:
-        folder = Path(folder)
-        result_dir = self.result / folder
-        result_dir.mkdir(exist_ok=True)
-        for sol in solutions:
-            copy_source(sol, self.source, result_dir)
-            sol.path = folder / sol.path.name
-
-    def samples(self, properties: "StatementProperties", folder: Path | str = "samples") \
-            -> tuple[Path, Path]:
+        self._copy_sources(solutions, Path(folder))
+
+    def samples(self, properties: list["StatementProperties"], folder: Path | str = "samples") \
+            -> dict[str | None, tuple[Path, Path]]:
         """
-        Copy samples files from Polygon package to CATS package.
-        Return path to samples input and answer.
+        Copy samples files of all statement languages from Polygon package to CATS package.
+        Return paths to samples input and answer by language, or by None when
+        the samples of all languages are the same.
         """
         folder = Path(folder)
-        source_dir = self.source / "statements" / properties.language
-        result_dir = self.result / folder
-        result_dir.mkdir(exist_ok=True)
-
-        for i in range(1, len(properties.sampleTests) + 1):
-            copy(source_dir / ("example.%02d" % i), result_dir)
-            copy(source_dir / ("example.%02d.a" % i), result_dir)
-        return folder / "example.%0n", folder / "example.%0n.a"
-
-    def tests(self, folder: Path | str = "tests") -> Path:
-        """Copy tests files from Polygon package to CATS package. Return path to tests dir."""
+        files = {prop.language: [Path("statements") / prop.language / name
+                                 for i in range(1, len(prop.sampleTests) + 1)
+                                 for name in ("example.%02d" % i, "example.%02d.a" % i)]
+                 for prop in properties if prop.sampleTests}
+        if not files:
+            return {}
+        duplicates = self._duplicates([path for paths in files.values() for path in paths])
+        # Duplicates are only compared, samples of one language may have the same content.
+        first, *others = [[duplicates.get(path, path) for path in paths]
+                          for paths in files.values()]
+        if all(paths == first for paths in others):
+            self._run([CopyJob(path, folder / path.name) for path in next(iter(files.values()))])
+            return {None: (folder / "example.%0n", folder / "example.%0n.a")}
+
+        self._run([CopyJob(path, folder / lang / path.name)
+                   for lang, paths in files.items() for path in paths])
+        return {lang: (folder / lang / "example.%0n", folder / lang / "example.%0n.a")
+                for lang in files}
+
+    def _duplicates(self, paths: list[Path]) -> dict[Path, Path]:
+        """
+        Return the duplicates among the files with their first copy.
+        Only the files of the same size (and zip checksum) are hashed, see hash_files.
+        """
+        candidates: dict[tuple, list[Path]] = {}
+        for path in paths:
+            key = (self.source.size(path), self.source.checksum(path))
+            candidates.setdefault(key, []).append(path)
+        if not self.hash_files:
+            return {path: same[0] for (_, checksum), same in candidates.items()
+                    if checksum is not None for path in same[1:]}
+        candidates = [path for same in candidates.values() if len(same) > 1 for path in same]
+
+        first: dict[tuple, Path] = {}
+        duplicates = {}
+        for path, digest in zip(candidates, self.engine.digests(candidates)):
+            key = (self.source.size(path), digest)
+            if key in first:
+                duplicates[path] = first[key]
+            else:
+                first[key] = path
+        return duplicates
+
+    def tests(self, test_set: "TestSetTag", folder: Path | str = "tests",
+              dedup: bool = False) -> Path:
+        """
+        Copy inputs of manual tests from Polygon package to CATS package. Return path to tests dir.
+        Generated inputs and answers are made by CATS itself, so they are not copied.
+        With dedup the same content is copied once, see aliases and dedup_report.
+        """
         folder = Path(folder)
-        source_dir = self.source / "tests"
-        result_dir = self.result / folder
-        result_dir.mkdir(exist_ok=True)
-        for test_path in source_dir.iterdir():
-            copy(test_path, result_dir)
+        paths = {Path(test_set.input_path_pattern % rank): folder / f"{rank:0>2}"
+                 for rank, test in enumerate(test_set.tests, 1) if test.method == "manual"}
+        if dedup:
+            duplicates = self._duplicates(list(paths))
+            self.aliases.update({paths[path]: paths[original]
+                                 for path, original in duplicates.items()})
+            self.dedup_report = DedupReport(len(paths), len(duplicates),
+                                            sum(map(self.source.size, duplicates)))
+            paths = {path: result for path, result in paths.items() if path not in duplicates}
+        self._run([CopyJob(path, result_path) for path, result_path in paths.items()])
         return folder
 
-    def statement_resources(self, properties: "StatementProperties",
+    def statement_resources(self, properties: list["StatementProperties"],
                             folder: Path | str = "files") -> list["ResourceTag"]:
         """
-        Copy statement/lang/resources files from Polygon package to CATS package.
+        Copy statement/lang/resources files of all languages from Polygon package to CATS package.
+        A file with the same name and content in every language is shared, the others are
+        language-specific: they have lang and are copied to folder/lang, the same name and
+        content of several languages once.
         Return the list of these resources.
         """
         folder = Path(folder)
-        result_dir = self.result / folder
-        result_dir.mkdir(exist_ok=True)
-        resources = parse_statement_resources(properties.path.parent,
-                                              len(properties.sampleTests), root_dir=self.source)
-
-        for res in resources:
-            copy_source(res, self.source, result_dir)
-            res.path = folder / res.path.name
+        by_name: dict[str, dict[str, "ResourceTag"]] = {}
+        for prop in properties:
+            for res in parse_statement_resources(prop.path.parent, len(prop.sampleTests),
+                                                 source=self.source):
+                by_name.setdefault(res.path.name, {})[prop.language] = res
+        duplicates = self._duplicates([res.path for variants in by_name.values()
+                                       for res in variants.values()])
+
+        resources, jobs, copied = [], [], {}
+        for name, variants in by_name.items():
+            contents = {duplicates.get(res.path, res.path) for res in variants.values()}
+            if len(variants) == len(properties) and len(contents) == 1:
+                variants = {None: next(iter(variants.values()))}
+            for lang, res in variants.items():
+                content = (name, duplicates.get(res.path, res.path))
+                if content not in copied:
+                    copied[content] = folder / name if lang is None else folder / lang / name
+                    jobs.append(CopyJob(res.path, copied[content]))
+                res.path, res.lang = copied[content], lang
+                resources.append(res)
+        self._run(jobs)
         return resources
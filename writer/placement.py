@@ -0,0 +1,95 @@
+import errno
+import os
+from pathlib import Path
+from shutil import copyfile, copymode
+
+from core import Logged
+
+try:
+    from fcntl import ioctl
+except ImportError:
+    ioctl = None
+
+__all__ = ["STRATEGIES", "Placer"]
+
+FICLONE = 0x40049409
+CHUNK = 1 << 30
+# Errors which mean the strategy is not supported for these files, not that the copy failed.
+UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.EINVAL,
+               errno.EPERM, errno.EMLINK, errno.ENOTTY, errno.EBADF}
+
+
+def _hardlink(src: Path, dst: Path) -> None:
+    os.link(src, dst)
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    with open(src, "rb") as inp, open(dst, "wb") as out:
+        ioctl(out.fileno(), FICLONE, inp.fileno())
+    copymode(src, dst)
+
+
+def _copy_file_range(src: Path, dst: Path) -> None:
+    with open(src, "rb") as inp, open(dst, "wb") as out:
+        size = os.fstat(inp.fileno()).st_size
+        while size > 0 and (copied := os.copy_file_range(inp.fileno(), out.fileno(),
+                                                          min(size, CHUNK))):
+            size -= copied
+        # Some file systems copy nothing without an error (e.g. procfs), the file is not complete.
+        if size > 0:
+            raise OSError(errno.EOPNOTSUPP, f"copy_file_range stopped, {size} bytes are left")
+    copymode(src, dst)
+
+
+def _sendfile(src: Path, dst: Path) -> None:
+    with open(src, "rb") as inp, open(dst, "wb") as out:
+        size = os.fstat(inp.fileno()).st_size
+        offset = 0
+        while offset < size and (sent := os.sendfile(out.fileno(), inp.fileno(),
+                                                     offset, min(size - offset, CHUNK))):
+            offset += sent
+        if offset < size:
+            raise OSError(errno.EOPNOTSUPP, f"sendfile stopped, {size - offset} bytes are left")
+    copymode(src, dst)
+
+
+def _copy(src: Path, dst: Path) -> None:
+    copyfile(src, dst)
+    copymode(src, dst)
+
+
+STRATEGIES = {
+    "hardlink": _hardlink,
+    "reflink": _reflink if ioctl else None,
+    "copy_file_range": _copy_file_range if hasattr(os, "copy_file_range") else None,
+    "sendfile": _sendfile if hasattr(os, "sendfile") else None,
+    "copy": _copy,
+}
+# Hardlink shares the file with polygon package, so it is used only by explicit choice.
+AUTO = ("reflink", "copy_file_range", "sendfile", "copy")
+
+
+class Placer(Logged):
+    """
+    Place files of the same file system into CATS package without reading them when possible.
+    Strategies are tried in order, unsupported one is dropped and the next is used instead.
+    """
+
+    def __init__(self, strategy: str = "auto"):
+        names = AUTO if strategy == "auto" else (strategy, "copy")
+        if strategy != "auto" and strategy not in STRATEGIES:
+            raise ValueError(f"Unknown placement strategy <{strategy}>, "
+                             f"must be one of: auto, {', '.join(STRATEGIES)}")
+        self.chain = tuple(dict.fromkeys(name for name in names if STRATEGIES[name]))
+
+    def place(self, src: Path, dst: Path) -> None:
+        for name in self.chain:
+            try:
+                STRATEGIES[name](src, dst)
+                return
+            except OSError as e:
+                if e.errno not in UNSUPPORTED or name == "copy":
+                    raise
+                self.chain = tuple(el for el in self.chain if el != name)
+                self.logger.info(f"Placement <{name}> is not supported ({e}), "
+                                 f"fallback to <{self.chain[0]}>")
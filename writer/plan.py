@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from parser.source import PackageSource
+from writer.engine import CopyJob
+from writer.target import PackageTarget
+
+__all__ = ["PlanTarget"]
+
+
+class PlanTarget(PackageTarget):
+    """
+    Plan of CATS package at path: nothing is written, the copied files are recorded as jobs
+    and the contents of the written files (cats.xml) are kept in memory.
+    """
+    concurrent = False
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = Path(path)
+        self.jobs: list[CopyJob] = []
+        self.contents: dict[Path, bytes] = {}
+
+    def write_from(self, source: PackageSource, path: Path, result_path: Path) -> None:
+        size = source.size(path)
+        self.jobs.append(CopyJob(path, result_path, size))
+        self._written(size)
+
+    def write_bytes(self, result_path: Path, data: bytes) -> None:
+        self.contents[result_path] = data
+        self._written(len(data))
+
+    @contextmanager
+    def open_stream(self, result_path: Path) -> Iterator[BinaryIO]:
+        with BytesIO() as out:
+            yield out
+            self.write_bytes(result_path, out.getvalue())
+
+    def to_dict(self) -> dict:
+        return {"path": str(self.path), "files": self.files, "bytes": self.bytes,
+                "copy": [{"path": job.path.as_posix(), "result": job.result_path.as_posix(),
+                          "size": job.size} for job in self.jobs],
+                "write": [{"result": path.as_posix(), "size": len(data)}
+                          for path, data in self.contents.items()]}
@@ -0,0 +1,56 @@
+import xml.etree.ElementTree as ET
+from typing import BinaryIO
+
+__all__ = ["XmlStream"]
+
+INDENT = "  "
+
+
+def _start_tag(el: ET.Element) -> bytes:
+    """Return the start tag of element serialized by ElementTree."""
+    return ET.tostring(ET.Element(el.tag, el.attrib), encoding="utf-8")[:-len(b" />")] + b">"
+
+
+class XmlStream:
+    """
+    Incremental writer of <CATS><Problem>...</Problem>...</CATS> document.
+    Children of <Problem> are written by batches, the output is the same
+    as ElementTree.indent and ElementTree.tostring of the whole tree.
+    """
+    batch_size = 512
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.started = False
+
+    def start(self, cats: ET.Element, problem: ET.Element) -> None:
+        """Write the xml declaration and start tags, <Problem> attributes can't be changed later."""
+        self.out.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+        self.out.write(_start_tag(cats) + f"\n{INDENT}".encode() + _start_tag(problem))
+        self.started = True
+
+    def write(self, problem: ET.Element) -> None:
+        """Write and remove all current children of <Problem>."""
+        if len(problem) == 0:
+            return
+        # The children are serialized at once inside the empty <_> tag, which is cut off.
+        wrapper = ET.Element("_")
+        wrapper.extend(problem)
+        del problem[:]
+        ET.indent(wrapper, INDENT, level=1)
+        wrapper[-1].tail = None
+        self.out.write(ET.tostring(wrapper, encoding="utf-8")[len(b"<_>"):-len(b"</_>")])
+
+    def finish(self, cats: ET.Element, problem: ET.Element) -> None:
+        """Write the rest of document."""
+        if not self.started:
+            ET.indent(cats, INDENT)
+            self.out.write(ET.tostring(cats, encoding="utf-8", xml_declaration=True))
+            return
+        self.write(problem)
+        self.out.write(f"\n{INDENT}</{problem.tag}>".encode())
+        for el in cats:
+            if el is not problem:
+                el.tail = None
+                self.out.write(f"\n{INDENT}".encode() + ET.tostring(el, encoding="utf-8"))
+        self.out.write(f"\n</{cats.tag}>".encode())
@@ -0,0 +1,200 @@
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from shutil import copyfileobj
+from tempfile import TemporaryFile
+from threading import Lock
+from typing import BinaryIO, Iterator
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED, ZIP64_LIMIT
+
+from core import Logged
+from parser.source import PackageSource, DirSource, ZipSource, COPY_BUFFER
+from writer.placement import Placer
+
+__all__ = ["PackageTarget", "DirTarget", "ZipTarget"]
+
+# Already compressed files are stored in the archive without recompression.
+STORED_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+RAW_METHODS = {ZIP_STORED, ZIP_DEFLATED}
+FLAG_ENCRYPTED = 0x1
+FLAG_DATA_DESCRIPTOR = 0x8
+FLAG_UTF8 = 0x800
+
+
+class PackageTarget(Logged):
+    """Write access to the files of CATS package by their local paths."""
+    # Files can be written from several threads at once.
+    concurrent = True
+
+    def __init__(self):
+        # Number of written files and their bytes, before compression.
+        self.files = 0
+        self.bytes = 0
+        self._stats_lock = Lock()
+
+    def _written(self, size: int) -> None:
+        with self._stats_lock:
+            self.files += 1
+            self.bytes += size
+
+    def write_from(self, source: PackageSource, path: Path, result_path: Path) -> None:
+        """Write the file of polygon package to result_path."""
+        raise NotImplementedError
+
+    def write_bytes(self, result_path: Path, data: bytes) -> None:
+        raise NotImplementedError
+
+    def open_stream(self, result_path: Path) -> Iterator[BinaryIO]:
+        """Context manager of the writable file which is saved to result_path on exit."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        """Close the target after a failed conversion."""
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class DirTarget(PackageTarget):
+    """
+    CATS package as a directory.
+    Files of unpacked polygon package are placed by the placement strategy (hardlink, reflink...).
+    """
+
+    def __init__(self, root: Path, placement: str = "auto"):
+        super().__init__()
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._dirs = {self.root}
+        self.placer = Placer(placement)
+
+    def full_path(self, result_path: Path) -> Path:
+        path = self.root / result_path
+        if path.parent not in self._dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._dirs.add(path.parent)
+        return path
+
+    def write_from(self, source: PackageSource, path: Path, result_path: Path) -> None:
+        result_path = self.full_path(result_path)
+        # The old file may be a hardlink to polygon package, it must not be written through.
+        result_path.unlink(missing_ok=True)
+        if isinstance(source, DirSource):
+            self.placer.place(source.full_path(path), result_path)
+        else:
+            source.copy(path, result_path)
+        self._written(result_path.stat().st_size)
+
+    def write_bytes(self, result_path: Path, data: bytes) -> None:
+        with open(self.full_path(result_path), "wb") as out:
+            out.write(data)
+        self._written(len(data))
+
+    @contextmanager
+    def open_stream(self, result_path: Path) -> Iterator[BinaryIO]:
+        with open(self.full_path(result_path), "wb") as out:
+            yield out
+            self._written(out.tell())
+
+
+class ZipTarget(PackageTarget):
+    """
+    CATS package as a *.zip archive, files are streamed into it as they are written.
+    Members of zipped polygon package are copied as they are compressed, without recompression.
+    The archive is written to *.part file and renamed after successful close.
+    """
+    concurrent = False
+
+    def __init__(self, zip_path: Path, compress_level: int = None):
+        super().__init__()
+        self.path = Path(zip_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._part_path = self.path.with_name(self.path.name + ".part")
+        self.zip = ZipFile(self._part_path, "w", ZIP_DEFLATED, compresslevel=compress_level)
+        self._lock = Lock()
+
+    def _open(self, result_path: Path, size: int) -> BinaryIO:
+        name = Path(result_path).as_posix()
+        force_zip64 = size * 1.05 > ZIP64_LIMIT
+        if Path(name).suffix.lower() not in STORED_SUFFIXES:
+            return self.zip.open(name, "w", force_zip64=force_zip64)
+        info = ZipInfo(name, time.localtime(time.time())[:6])
+        info.compress_type = ZIP_STORED
+        info.external_attr = 0o600 << 16
+        return self.zip.open(info, "w", force_zip64=force_zip64)
+
+    def _write_raw(self, source: ZipSource, path: Path, result_path: Path) -> bool:
+        """Copy compressed data of the member with its CRC and sizes, return False if it can't."""
+        with source.open_raw(path) as (src, inp):
+            # Other methods are not supported by many unzip tools, they are recompressed.
+            if src.flag_bits & FLAG_ENCRYPTED or src.compress_type not in RAW_METHODS:
+                return False
+            info = ZipInfo(Path(result_path).as_posix(), src.date_time)
+            info.compress_type = src.compress_type
+            info.external_attr = src.external_attr
+            info.extract_version = src.extract_version
+            # The sizes are known, so they are written to the header instead of a descriptor.
+            info.flag_bits = src.flag_bits & ~(FLAG_DATA_DESCRIPTOR | FLAG_UTF8)
+            info.CRC, info.compress_size, info.file_size = \
+                src.CRC, src.compress_size, src.file_size
+            zip64 = info.file_size > ZIP64_LIMIT or info.compress_size > ZIP64_LIMIT
+            with self._lock:
+                fp = self.zip.fp
+                fp.seek(self.zip.start_dir)
+                info.header_offset = fp.tell()
+                fp.write(info.FileHeader(zip64))
+                left = info.compress_size
+                while left > 0 and (chunk := inp.read(min(left, COPY_BUFFER))):
+                    fp.write(chunk)
+                    left -= len(chunk)
+                if left:
+                    raise EOFError(f"Compressed data of `{path}` is truncated ({source.path})")
+                self.zip.filelist.append(info)
+                self.zip.NameToInfo[info.filename] = info
+                self.zip.start_dir = fp.tell()
+                self.zip._didModify = True
+        return True
+
+    def write_from(self, source: PackageSource, path: Path, result_path: Path) -> None:
+        size = source.size(path)
+        if isinstance(source, ZipSource) and self._write_raw(source, path, result_path):
+            self._written(size)
+            return
+        with self._lock, source.open(path) as inp, self._open(result_path, size) as out:
+            copyfileobj(inp, out, COPY_BUFFER)
+        self._written(size)
+
+    def write_bytes(self, result_path: Path, data: bytes) -> None:
+        with self._lock, self._open(result_path, len(data)) as out:
+            out.write(data)
+        self._written(len(data))
+
+    @contextmanager
+    def open_stream(self, result_path: Path) -> Iterator[BinaryIO]:
+        """The file is kept in the temporary file, so other files can be written meanwhile."""
+        with TemporaryFile() as tmp:
+            yield tmp
+            size = tmp.tell()
+            tmp.seek(0)
+            with self._lock, self._open(result_path, size) as out:
+                copyfileobj(tmp, out, COPY_BUFFER)
+            self._written(size)
+
+    def close(self) -> None:
+        self.zip.close()
+        self._part_path.replace(self.path)
+        self.logger.debug(f"Archive saved ({self.path})")
+
+    def abort(self) -> None:
+        self.zip.close()
+        self._part_path.unlink(missing_ok=True)
@@ -0,0 +1,249 @@
+import re
+import xml.etree.ElementTree as ET
+
+__all__ = ["tex2cats"]
+
+_TOKEN = re.compile(r"""
+    (?P<math>\$\$.+?\$\$|\$(?:\\.|[^$\\])+\$)
+  | (?P<comment>%[^\n]*\n?[ \t]*)
+  | (?P<par>\n[ \t]*\n\s*)
+  | (?P<space>\s+)
+  | (?P<br>\\\\)
+  | (?P<escape>\\[%$&_#{}])
+  | (?P<thin>\\[,;: ])
+  | (?P<env>\\(?P<env_cmd>begin|end)\s*\{(?P<env_name>[a-zA-Z*]+)\})
+  | (?P<picture>\\includegraphics\s*(?:\[[^\]]*\])?\s*\{(?P<picture_name>[^}]*)\})
+  | (?P<command>\\[a-zA-Z]+)
+  | (?P<lbrace>\{)
+  | (?P<rbrace>\})
+  | (?P<dash>---?)
+  | (?P<quote><<|>>|``|'')
+  | (?P<tilde>~)
+  | (?P<text>[^\\{}$%\s~<>`'-]+)
+  | (?P<other>.)
+""", re.X | re.S)
+
+# Commands with one argument which are formatted by tags.
+FORMATS = {"textbf": "b", "emph": "i", "textit": "i", "texttt": "code", "underline": "u"}
+LISTS = {"itemize": "ul", "enumerate": "ol"}
+SYMBOLS = {"ldots": "…", "dots": "…", "textendash": "–", "textemdash": "—",
+           "quad": " ", "qquad": "  "}
+DASHES = {"--": "–", "---": "—"}
+# Argument of unknown command is kept with its braces.
+LITERAL = "{}"
+QUOTES = {"<<": "«", ">>": "»", "``": "“", "''": "”"}
+
+
+class _Builder:
+    """
+    Tree of CATS statement tags built by one pass over tokens.
+    Blocks are <p>, <ul> and <ol>, text of a list item goes to <li> itself.
+    The text is collected to the pending list and joined once before the next tag.
+    """
+
+    def __init__(self):
+        self.root = ET.Element("_")
+        # Open block containers: root, <ul>/<ol> and <li>.
+        self.blocks = [self.root]
+        # Element which receives the text: <p> or <li> with open inline tags, None for groups.
+        self.inline: list[ET.Element | None] = []
+        self.pending: list[str] = []
+        # The last text ends with a space, the next spaces are dropped as LaTeX does.
+        self.space = False
+
+    @property
+    def _current(self) -> ET.Element | None:
+        for el in reversed(self.inline):
+            if el is not None:
+                return el
+        return None
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+        data = "".join(self.pending)
+        self.pending.clear()
+        el = self._current
+        if len(el):
+            el[-1].tail = (el[-1].tail or "") + data
+        else:
+            el.text = (el.text or "") + data
+
+    def _open_paragraph(self) -> None:
+        if self.inline:
+            return
+        container = self.blocks[-1]
+        if container.tag == "li":
+            self.inline.append(container)
+        elif container.tag == "_":
+            self.inline.append(ET.SubElement(container, "p"))
+        else:
+            # Text of the list outside of items is lost, as LaTeX does.
+            self.inline.append(None)
+
+    def close_paragraph(self) -> None:
+        if not self.inline:
+            return
+        first = next((el for el in self.inline if el is not None), None)
+        if first is not None:
+            self._flush()
+            _strip(first)
+            if first.tag == "p" and not len(first) and not first.text:
+                self.blocks[-1].remove(first)
+        self.pending.clear()
+        self.inline.clear()
+        self.space = False
+
+    def paragraph(self) -> None:
+        """Empty line ends the paragraph, but not the list item."""
+        if self.blocks[-1].tag == "li":
+            self.text(" ")
+        else:
+            self.close_paragraph()
+
+    def text(self, data: str) -> None:
+        if not self.inline:
+            if data.isspace():
+                return
+            self._open_paragraph()
+        if data == " " and self.space:
+            return
+        if self._current is not None:
+            self.pending.append(data)
+            self.space = data.endswith(" ")
+
+    def element(self, tag: str, attrib: dict = None) -> None:
+        self._open_paragraph()
+        if (el := self._current) is not None:
+            self._flush()
+            ET.SubElement(el, tag, attrib or {})
+            self.space = False
+
+    def open_group(self, tag: str = None) -> None:
+        self._open_paragraph()
+        el = self._current
+        if tag is None or el is None:
+            self.inline.append(None)
+            return
+        self._flush()
+        self.inline.append(ET.SubElement(el, tag))
+
+    def close_group(self) -> None:
+        # The first inline element is the paragraph, it is not a group.
+        if len(self.inline) > 1:
+            if self.inline[-1] is not None:
+                self._flush()
+            self.inline.pop()
+
+    def begin_list(self, tag: str) -> None:
+        self.close_paragraph()
+        self.blocks.append(ET.SubElement(self.blocks[-1], tag))
+
+    def item(self) -> None:
+        self.close_paragraph()
+        if self.blocks[-1].tag == "li":
+            self.blocks.pop()
+        if self.blocks[-1].tag in LISTS.values():
+            self.blocks.append(ET.SubElement(self.blocks[-1], "li"))
+
+    def end_list(self) -> None:
+        self.close_paragraph()
+        if self.blocks[-1].tag == "li":
+            self.blocks.pop()
+        if len(self.blocks) > 1:
+            self.blocks.pop()
+
+
+def _strip(el: ET.Element) -> None:
+    """Strip whitespaces at the start and at the end of the element text."""
+    if el.text:
+        el.text = el.text.lstrip()
+    if len(el):
+        if el[-1].tail:
+            el[-1].tail = el[-1].tail.rstrip()
+    elif el.text:
+        el.text = el.text.rstrip()
+
+
+def tex2cats(txt: str | None) -> list[ET.Element]:
+    """
+    Convert Polygon TeX to the list of CATS statement tags in one linear pass:
+    paragraphs, \\textbf/\\emph, itemize/enumerate, \\includegraphics; math is kept as it is.
+    Unknown commands are kept as text.
+    """
+    if not txt:
+        return []
+    builder = _Builder()
+    # Tag of the argument of the last command, and LITERAL or tags of open braces.
+    argument = None
+    braces = []
+    for match in _TOKEN.finditer(txt):
+        kind = match.lastgroup
+        value = match.group()
+        if argument not in (None, LITERAL) and kind in ("math", "text", "other", "escape"):
+            # Argument without braces is the next character (or formula).
+            builder.open_group(argument)
+            builder.text(value if kind == "math" else value[1] if kind == "escape" else value[0])
+            builder.close_group()
+            argument = None
+            if kind != "text" or len(value) == 1:
+                continue
+            value = value[1:]
+        if kind not in ("lbrace", "space", "comment"):
+            argument = None
+        match kind:
+            case "math" | "text" | "other":
+                builder.text(value)
+            case "space" if argument not in (None, LITERAL):
+                # Spaces after the command are skipped.
+                pass
+            case "space":
+                builder.text(" ")
+            case "par":
+                builder.paragraph()
+            case "comment":
+                pass
+            case "br":
+                builder.element("br")
+            case "escape":
+                builder.text(value[1])
+            case "thin":
+                builder.text(" ")
+            case "tilde":
+                builder.text(" ")
+            case "dash":
+                builder.text(DASHES[value])
+            case "quote":
+                builder.text(QUOTES[value])
+            case "env" if match.group("env_name") in LISTS:
+                if match.group("env_cmd") == "begin":
+                    builder.begin_list(LISTS[match.group("env_name")])
+                else:
+                    builder.end_list()
+            case "env":
+                pass
+            case "picture":
+                builder.element("img", {"picture": match.group("picture_name").strip()})
+            case "command":
+                name = value[1:]
+                if name == "item":
+                    builder.item()
+                elif name in FORMATS:
+                    argument = FORMATS[name]
+                elif name in SYMBOLS:
+                    builder.text(SYMBOLS[name])
+                else:
+                    builder.text(value)
+                    argument = LITERAL
+            case "lbrace":
+                if argument == LITERAL:
+                    builder.text("{")
+                builder.open_group(None if argument == LITERAL else argument)
+                braces.append(argument)
+                argument = None
+            case "rbrace":
+                builder.close_group()
+                if braces and braces.pop() == LITERAL:
+                    builder.text("}")
+    builder.close_paragraph()
+    return list(builder.root)
@@ -1,10 +1,11 @@
 import typing
 from pathlib import Path
 
-__all__ = ["cats_rank", "names2languages", "proc_text", "cats_lang", "choose_name", "choose_properties", "choose_testset", "file_name", "str_format2cats", "get_generators", "get_groups_tests"]
+__all__ = ["cats_rank", "cats_ranges", "names2languages", "cats_lang", "choose_name", "choose_properties", "choose_testset", "file_name", "str_format2cats", "get_generators", "get_groups_tests"]
 
 if typing.TYPE_CHECKING:
     from parser.models import *
+    from parser.problem import LazyTests
     from parser.statement import StatementProperties
 
 
@@ -32,23 +33,6 @@ def names2languages(names: list["NameTag"]) -> str:
     return ",".join(map(one, names))
 
 
-def proc_text(txt: str) -> list[str]:
-    """Process text from Polygon Tex format to list of paragraphs."""
-    if not txt:
-        return []
-    txt = txt.splitlines()
-    txt.append("")
-    res = []
-    temp = ""
-    for el in txt:
-        if el:
-            temp += el
-        elif temp:
-            res.append(temp)
-            temp = ""
-    return res
-
-
 def choose_name(names: list["NameTag"]) -> "NameTag":
     """Choose the name of polygon's names list."""
     return names[0]
@@ -75,36 +59,54 @@ def str_format2cats(data: str) -> str:
 
 
 def get_generators(resources: list["ExecutableTag"],
-                   tests: list["TestTag"]) -> list["ExecutableTag"]:
+                   tests: "TestTable | LazyTests") -> list["ExecutableTag"]:
     """Filter and get generator resource tag."""
-    generator_names = set()
-    for t in tests:
-        if t.is_generated:
-            generator_names.add(t.generator)
-
+    generator_names = tests.distinct_generators()
     return [r for r in resources if file_name(r.path) in generator_names]
 
 
-def get_groups_tests(test_set: "TestSetTag"):
-    def proc_group(name: str, tests: list[int]) -> str:
-        if len(tests) == 1:
-            return str(*(t for t in tests))
-        first = delta = last = None
-        for t in tests:
-            if first is None:
-                first = t
-            elif delta is None:
-                delta = t - last
-            else:
-                if t - last != delta:
-                    raise ValueError(f"Test group<{name}> cannot be added. "
-                                     f"Impossible to set all the tests {tests}")
-            last = t
-        if delta == 1:
-            return f"{first}-{last}"
-        return f"{first}-{last}-{delta}"
-    groups = {g.name: set() for g in test_set.groups}
-    for i, test in enumerate(test_set.tests):
-        groups[test.group].add(i + 1)
-
-    return {k: proc_group(k, sorted(g)) for k, g in groups.items()}
+def cats_ranges(ranks: list[int]) -> str:
+    """
+    Return sorted ranks formatted as the shortest CATS list of ranges: `a`, `a-b` and `a-b-step`.
+    Each range covers consecutive ranks of the list, the ranges are chosen by linear
+    dynamic programming: the best range ending at a rank starts inside the current
+    arithmetic run, so the best start is kept for the run instead of searching for it.
+    """
+    n = len(ranks)
+    if n == 0:
+        return ""
+    lens = [len(str(r)) for r in ranks]
+    # cost[k] is the length of the best encoding of first k ranks with a comma after each range
+    cost = [0] * (n + 1)
+    start = [0] * (n + 1)
+    best = best_i = None
+    for j in range(n):
+        cost[j + 1], start[j + 1] = cost[j] + lens[j] + 1, j
+        if j == 0:
+            continue
+        step = ranks[j] - ranks[j - 1]
+        if j == 1 or step != ranks[j - 1] - ranks[j - 2]:
+            best = None
+        if best is None or cost[j - 1] + lens[j - 1] < best:
+            best, best_i = cost[j - 1] + lens[j - 1], j - 1
+        range_cost = best + 1 + lens[j] + (0 if step == 1 else 1 + len(str(step))) + 1
+        if range_cost <= cost[j + 1]:
+            cost[j + 1], start[j + 1] = range_cost, best_i
+
+    parts = []
+    end = n
+    while end > 0:
+        i = start[end]
+        if i == end - 1:
+            parts.append(str(ranks[i]))
+        else:
+            step = ranks[i + 1] - ranks[i]
+            parts.append(f"{ranks[i]}-{ranks[end - 1]}" + ("" if step == 1 else f"-{step}"))
+        end = i
+    return ",".join(reversed(parts))
+
+
+def get_groups_tests(test_set: "TestSetTag") -> dict[str, list[int]]:
+    """Return ranks of tests of every group of the test set."""
+    groups = test_set.tests.tests_per_group()
+    return {g.name: groups.get(g.name, []) for g in test_set.groups}
@@ -1,30 +1,49 @@
 import xml.etree.ElementTree as ET
 
 from pathlib import Path
+from typing import BinaryIO
 import typing
 
 from writer.utils import *
+from writer.stream import XmlStream
+from writer.tex import tex2cats
 import config as cfg
 
 if typing.TYPE_CHECKING:
     from parser.problem import Problem
     from parser.statement import StatementProperties
     from parser.models import *
+    from writer.target import PackageTarget
 
 __all__ = ["CatsXml"]
 
 
 class CatsBaseXml:
-    def __init__(self, version: str = "1.11"):
+    def __init__(self, version: str = "1.11", stream: BinaryIO = None):
+        """
+        With stream the xml is written to it as tags are added, and only the last children
+        of <Problem> are kept in memory: a child can be changed until the next one is added.
+        """
         self.cats = ET.Element("CATS", {"version": version})
         self.problem = ET.SubElement(self.cats, "Problem")
         self.names = set()
         self.run = None
-
-    def _proc_name(self, name: str) -> None:
-        if name in self.names:
+        self.stream = None if stream is None else XmlStream(stream)
+
+    def _add_child(self, tag: str, attrib: dict = None) -> ET.Element:
+        """Add the child tag to <Problem>."""
+        if self.stream is not None:
+            if not self.stream.started:
+                self.stream.start(self.cats, self.problem)
+            if len(self.problem) >= self.stream.batch_size:
+                self.stream.write(self.problem)
+        return ET.SubElement(self.problem, tag, attrib or {})
+
+    def _proc_name(self, name: str, cats_if: str = None) -> None:
+        """Names must be unique, but tags for different conditions may have the same name."""
+        if (name, cats_if) in self.names:
             raise AttributeError(f"Name({name}) of tag must be unique.")
-        self.names.add(name)
+        self.names.add((name, cats_if))
 
     def _set_problem(self, title: str = None, tLimit: int = None, mLimit: str = None,
                      inputFile: str = None, outputFile: str = None, lang: str = None,
@@ -46,16 +65,18 @@ class CatsBaseXml:
             "saveAnswerPrefix": saveAnswerPrefix
         }
 
+        if self.stream is not None and self.stream.started:
+            raise ValueError("Attributes of <Problem> must be set before adding tags to it")
         attrib = {k: (el if el else self.problem.attrib.get(k))
                   for k, el in attrib.items()}
         self.problem.attrib.update({k: el for k, el in attrib.items() if el})
 
         return self.problem
 
-    def _add_text_tag(self, tag: str, data: list[str], lang: str = None) -> ET.Element:
+    def _add_text_tag(self, tag: str, data: list[ET.Element], lang: str = None) -> ET.Element:
         attrib = {"cats_if": f"lang={lang}"} if lang else {}
-        root_el = ET.SubElement(self.problem, tag, attrib)
-        _add_text(root_el, data)
+        root_el = self._add_child(tag, attrib)
+        root_el.extend(data)
         return root_el
 
     def _add_import(self, guid: str, type_import: str = None, name: str = None) -> ET.Element:
@@ -66,7 +87,7 @@ class CatsBaseXml:
         if name:
             attrib["name"] = name
             self._proc_name(name)
-        return ET.SubElement(self.problem, "Import", attrib)
+        return self._add_child("Import", attrib)
 
     def _add_file(self, tag: str, name: str, path: Path,
                   compiler: "cfg.Compiler" = None, **kwargs) -> ET.Element:
@@ -74,11 +95,11 @@ class CatsBaseXml:
             kwargs["de_code"] = str(compiler.value)
         kwargs["name"] = name
         kwargs["src"] = path.as_posix()
-        self._proc_name(name)
-        return ET.SubElement(self.problem, tag, attrib=kwargs)
+        self._proc_name(name, kwargs.get("cats_if"))
+        return self._add_child(tag, kwargs)
 
     def _set_run(self, method: str) -> ET.Element:
-        self.run = ET.SubElement(self.problem, "Run", {"method": method})
+        self.run = self._add_child("Run", {"method": method})
         return self.run
 
     def _add_test(self, in_kwargs: dict = None, out_kwargs: dict = None, **kwargs) -> ET.Element:
@@ -86,7 +107,7 @@ class CatsBaseXml:
             out_kwargs = {}
         if in_kwargs is None:
             in_kwargs = {}
-        test = ET.SubElement(self.problem, "Test", attrib=kwargs)
+        test = self._add_child("Test", kwargs)
         if in_kwargs:
             ET.SubElement(test, "In", attrib=in_kwargs)
         if out_kwargs:
@@ -95,8 +116,8 @@ class CatsBaseXml:
 
 
 class CatsXml(CatsBaseXml):
-    def __init__(self, cats_version: str = "1.11"):
-        super().__init__(cats_version)
+    def __init__(self, cats_version: str = "1.11", stream: BinaryIO = None):
+        super().__init__(cats_version, stream)
         self.added_samples = False
         self.run = None
         self.checker = None
@@ -124,32 +145,34 @@ class CatsXml(CatsBaseXml):
 
     def add_txt_by_properties(self, properties: "StatementProperties") -> None:
         lang = cats_lang(properties.language)
-        if legend := proc_text(properties.legend):
+        if legend := tex2cats(properties.legend):
             self._add_text_tag("ProblemStatement", legend, lang)
-        if inp := proc_text(properties.input):
+        if inp := tex2cats(properties.input):
             self._add_text_tag("InputFormat", inp, lang)
-        output = proc_text(properties.output)
+        output = tex2cats(properties.output)
         if output:
             output = self._add_text_tag("OutputFormat", output, lang)
 
-        if interaction := proc_text(properties.interaction):
+        if interaction := tex2cats(properties.interaction):
             if len(output) == 0:
                 output = self._add_text_tag("OutputFormat", [], lang)
             _add_txt_block(output, cfg.headings["interaction"][lang], interaction)
-        if notes := proc_text(properties.notes):
+        if notes := tex2cats(properties.notes):
             if len(output) == 0:
                 output = self._add_text_tag("OutputFormat", [], lang)
             _add_txt_block(output, cfg.headings["notes"][lang], notes)
-        if tutorial := proc_text(properties.tutorial):
+        if tutorial := tex2cats(properties.tutorial):
             self._add_text_tag("Explanation", tutorial, lang)
 
     def add_samples_by_properties(self, properties: "StatementProperties", use_file: bool = False,
-                                  local_in: Path = None, local_ans: Path = None) -> None:
+                                  local_in: Path = None, local_ans: Path = None,
+                                  shared: bool = False) -> None:
+        """Add samples of the statement language, or of all languages if they are shared."""
         def _with_file(samples_count: int, lang_if: str = None):
             attrib = {"rank": cats_rank(samples_count)}
             if lang_if:
                 attrib["cats_if"] = f"lang={lang_if}"
-            samp = ET.SubElement(self.problem, "Sample", attrib)
+            samp = self._add_child("Sample", attrib)
             ET.SubElement(samp, "SampleIn", {"src": local_in.as_posix()})
             ET.SubElement(samp, "SampleOut", {"src": local_ans.as_posix()})
 
@@ -157,11 +180,11 @@ class CatsXml(CatsBaseXml):
             attrib = {"rank": str(rank)}
             if lang_if:
                 attrib["cats_if"] = f"lang={lang_if}"
-            samp = ET.SubElement(self.problem, "Sample", attrib)
+            samp = self._add_child("Sample", attrib)
             ET.SubElement(samp, "SampleIn").text = inp
             ET.SubElement(samp, "SampleOut").text = out
 
-        lang = cats_lang(properties.language)
+        lang = None if shared else cats_lang(properties.language)
         if use_file:
             _with_file(len(properties.sampleTests), lang_if=lang)
         else:
@@ -232,8 +255,9 @@ class CatsXml(CatsBaseXml):
         """Add Test Set tag to cats xml."""
         return self._add_test(out_kwargs={"use": "main"}, rank=cats_rank(int(test_set.test_count)))
 
-    def add_test_in(self, rank: int, test: "TestTag", test_path: Path) -> ET.Element:
-        """Add Test and Test/<In> to cats xml."""
+    def add_test_in(self, rank: int, test: "TestTag", test_path: Path,
+                    aliases: dict[Path, Path] = None) -> ET.Element:
+        """Add Test and Test/<In> to cats xml, aliases replace paths of duplicate files."""
         match test.method:
             case "generated":
                 attribs = {"use": test.generator, "param": test.params}
@@ -241,37 +265,53 @@ class CatsXml(CatsBaseXml):
                     attribs["points"] = str(test.points)
                 return self._add_test(rank=str(rank), in_kwargs=attribs)
             case "manual":
-                attribs = {"src": (test_path / f"{rank:0>2}").as_posix()}
+                src = test_path / f"{rank:0>2}"
+                attribs = {"src": (aliases or {}).get(src, src).as_posix()}
                 if test.points is not None:
                     attribs["points"] = str(test.points)
                 return self._add_test(rank=str(rank), in_kwargs=attribs)
             case _:
                 raise ValueError(f"Test tag has not processed method: <{test.method}>")
 
-    def add_group(self, group: "GroupTag", tests: str) -> ET.Element:
-        """Add <Testset> to cats xml."""
+    def add_group(self, group: "GroupTag", tests: str | list[int]) -> ET.Element:
+        """Add <Testset> to cats xml. Tests are CATS ranges or sorted test ranks."""
+        if not isinstance(tests, str):
+            tests = cats_ranges(tests)
         attrib = {"name": group.name, "tests": tests}
         if group.points is not None:
             attrib["points"] = str(group.points)
         if group.dependencies:
             attrib["dependencies"] = ",".join(group.dependencies)
-        return ET.SubElement(self.problem, "Testset", attrib=attrib)
+        return self._add_child("Testset", attrib)
 
-    def add_label(self, version: str = "0.2") -> None:
+    def add_label(self, version: str = cfg.version) -> None:
         self.cats.append(ET.Comment(f"This packet auto-generated by Baderik v{version}"))
         self.cats.append(ET.Comment(f"https://github.com/Baderik/polygon2cats"))
 
-    def save(self, path: Path) -> None:
+    def save(self, path: Path = None, target: "PackageTarget" = None) -> None:
+        """
+        Save cats xml to path, or to the local path of target package if it is given.
+        In stream mode finish the stream instead.
+        """
+        if self.stream is not None:
+            self.stream.finish(self.cats, self.problem)
+            return
+        ET.indent(self.cats)
+        data = ET.tostring(self.cats, encoding="utf-8", xml_declaration=True)
+        if target is not None:
+            target.write_bytes(path, data)
+            return
         with open(path, "wb") as out:
-            ET.indent(self.cats)
-            out.write(ET.tostring(self.cats, encoding="utf-8", xml_declaration=True))
+            out.write(data)
 
     def add_resources(self, resources: list["ResourceTag"]) -> None:
+        """Add Picture and Attachment tags, language-specific ones with cats_if."""
         for res in resources:
+            kwargs = {"cats_if": f"lang={cats_lang(res.lang)}"} if res.lang else {}
             if res.is_picture:
-                self.add_picture(res)
+                self.add_picture(res, **kwargs)
             else:
-                self.add_attachment(res)
+                self.add_attachment(res, **kwargs)
 
     def add_modules(self, modules: list["ResourceTag"]) -> None:
         services = {"files/olymp.sty", "files/problem.tex", "files/statements.ftl",
@@ -285,15 +325,10 @@ class CatsXml(CatsBaseXml):
                            compiler=module.type)
 
 
-def _add_text(root: ET.Element, data: list[str], tag: str = "p") -> None:
-    for txt in data:
-        ET.SubElement(root, tag).text = txt
-
-
 def _add_heading(root: ET.Element, txt: str, tag: str = "h3") -> None:
     ET.SubElement(root, tag).text = txt
 
 
-def _add_txt_block(root: ET.Element, heading: str, data: list[str]) -> None:
+def _add_txt_block(root: ET.Element, heading: str, data: list[ET.Element]) -> None:
     _add_heading(root, heading)
-    _add_text(root, data)
+    root.extend(data)